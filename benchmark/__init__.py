@@ -0,0 +1,4 @@
+"""Benchmarks of `moirae`. Every module is a standalone script, run the whole suite with:
+
+    python -m benchmark.suite --output results.json
+"""
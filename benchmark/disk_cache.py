@@ -0,0 +1,67 @@
+"""Measure put/get/exists throughput of `moirae.DiskCache`.
+
+    python benchmark/disk_cache.py --entries 1000000 --value-size 256 --root /tmp/moirae-bench
+"""
+import argparse
+import asyncio
+import hashlib
+import os
+import shutil
+import sys
+import tempfile
+from time import perf_counter
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+import moirae
+
+
+async def run_batched(func, keys, concurrency: int):
+    for i in range(0, len(keys), concurrency):
+        await asyncio.gather(*(func(k) for k in keys[i: i + concurrency]))
+
+
+async def benchmark(cache: moirae.Cache, num_entries: int, value_size: int, concurrency: int):
+    keys = [hashlib.blake2b(i.to_bytes(8, 'little')).hexdigest() for i in range(num_entries)]
+    value = os.urandom(value_size)
+    results = {}
+
+    async def put(k):
+        await cache.put(k, value)
+
+    async def get(k):
+        try:
+            await cache.get(k)
+        except moirae.CacheIOError:
+            # Garbage collected under `max_bytes`
+            pass
+
+    async def exists(k):
+        await cache.exists(k)
+
+    for name, func in (('put', put), ('get', get), ('exists', exists)):
+        start = perf_counter()
+        await run_batched(func, keys, concurrency)
+        results[name] = num_entries / (perf_counter() - start)
+
+    return results
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--entries', type=int, default=1000000)
+    parser.add_argument('--value-size', type=int, default=256)
+    parser.add_argument('--concurrency', type=int, default=256)
+    parser.add_argument('--max-bytes', type=int, default=None)
+    parser.add_argument('--root', type=str, default=None)
+    args = parser.parse_args()
+
+    root_dir = args.root or tempfile.mkdtemp(prefix='moirae-bench-')
+    try:
+        cache = moirae.DiskCache(root_dir, max_bytes=args.max_bytes)
+        results = asyncio.run(benchmark(cache, args.entries, args.value_size, args.concurrency))
+    finally:
+        shutil.rmtree(root_dir, ignore_errors=True)
+
+    print(f'{"op":<8} {"ops/s":>12}')
+    for name, throughput in results.items():
+        print(f'{name:<8} {throughput:>12.0f}')
@@ -0,0 +1,67 @@
+"""Compare latency and peak memory of copying and zero-copy dataflow on fan-out-heavy graphs.
+
+    python benchmark/fanout.py --fanout 10 100 --size 100000
+"""
+import argparse
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+import moirae
+from benchmark.utils import measure
+
+
+class FanoutSource(moirae.Node):
+    class Input(moirae.Data):
+        size: int
+
+    class Output(moirae.FrozenData):
+        items: list[int]
+        blob: bytes
+        table: dict[str, int]
+
+    async def execute(self, inputs: Input):
+        return self.Output(
+            items=list(range(inputs.size)),
+            blob=bytes(inputs.size * 8),
+            table={str(i): i for i in range(inputs.size // 10)})
+
+
+class FanoutSink(moirae.Node):
+    class Input(moirae.Data):
+        items: list[int]
+        blob: bytes
+        table: dict[str, int]
+
+    class Output(moirae.Data):
+        o: int
+
+    async def execute(self, inputs: Input):
+        return self.Output(o=len(inputs.items) + len(inputs.blob) + len(inputs.table))
+
+
+def fanout_graph(fanout: int, size: int):
+    graph = {'source': {'node': 'FanoutSource', 'arguments': {}, 'inputs': {'size': size}}}
+    for i in range(fanout):
+        graph[f'sink{i}'] = {
+            'node': 'FanoutSink',
+            'arguments': {},
+            'inputs': {'items': '${source.items}', 'blob': '${source.blob}', 'table': '${source.table}'}
+        }
+
+    return graph
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--fanout', type=int, nargs='+', default=[10, 100])
+    parser.add_argument('--size', type=int, default=100000)
+    args = parser.parse_args()
+
+    print(f'{"fanout":>8} {"mode":<10} {"latency(s)":>12} {"peak mem(MiB)":>14}')
+    for fanout in args.fanout:
+        graph = moirae.Graph(fanout_graph(fanout, args.size))
+
+        for name, zero_copy in (('copy', False), ('zero-copy', True)):
+            elapsed, peak = measure(graph, zero_copy=zero_copy)
+            print(f'{fanout:>8} {name:<10} {elapsed:>12.3f} {peak / 2 ** 20:>14.2f}')
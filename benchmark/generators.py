@@ -0,0 +1,114 @@
+"""Synthetic workflow definitions for benchmarks.
+
+Every generator returns a graph definition of `num_nodes` nodes of one kind:
+- "noop": returns at once, measures the overhead of moirae itself
+- "sleep": awaits `asyncio.sleep`, like I/O-bound nodes
+- "cpu": busy loops in a thread, like CPU-bound nodes
+"""
+import asyncio
+import os
+import random
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+import moirae
+
+
+class BenchNoop(moirae.Node):
+    class Input(moirae.Data):
+        x: int
+        y: int = 0
+
+    class Output(moirae.Data):
+        o: int
+
+    async def execute(self, inputs: Input):
+        # Bounded, as sums double at every join of diamonds and layers and overflow int64 of msgpack
+        return self.Output(o=(inputs.x + inputs.y) % 2 ** 31)
+
+
+class BenchSleep(moirae.Node):
+    seconds: float = 0.001
+
+    class Input(moirae.Data):
+        x: int
+        y: int = 0
+
+    class Output(moirae.Data):
+        o: int
+
+    async def execute(self, inputs: Input):
+        await asyncio.sleep(self.seconds)
+
+        return self.Output(o=(inputs.x + inputs.y) % 2 ** 31)
+
+
+class BenchCPU(moirae.Node):
+    backend = 'thread'
+    iterations: int = 10000
+
+    class Input(moirae.Data):
+        x: int
+        y: int = 0
+
+    class Output(moirae.Data):
+        o: int
+
+    def execute(self, inputs: Input):
+        o = inputs.x + inputs.y
+        for i in range(self.iterations):
+            o = (o * 31 + i) % 1000003
+
+        return self.Output(o=o)
+
+
+KINDS = {'noop': 'BenchNoop', 'sleep': 'BenchSleep', 'cpu': 'BenchCPU'}
+
+
+def _node(kind: str, x, y=0):
+    return {'node': KINDS[kind], 'arguments': {}, 'inputs': {'x': x, 'y': y}}
+
+
+def _ref(i: int):
+    return f'${{n{i}.o}}'
+
+
+def chain(num_nodes: int, kind: str = 'noop'):
+    # n0 -> n1 -> ... -> n{num_nodes - 1}
+    return {f'n{i}': _node(kind, _ref(i - 1) if i else 0, i) for i in range(num_nodes)}
+
+
+def fanout(num_nodes: int, kind: str = 'noop'):
+    # n0 -> every other node
+    return {f'n{i}': _node(kind, _ref(0) if i else 0, i) for i in range(num_nodes)}
+
+
+def diamond(num_nodes: int, kind: str = 'noop'):
+    # Chained diamonds: n{3k} -> n{3k + 1}, n{3k + 2} -> n{3k + 3}
+    graph = {}
+    for i in range(num_nodes):
+        if(i == 0):
+            graph['n0'] = _node(kind, 0)
+        elif(i % 3):
+            graph[f'n{i}'] = _node(kind, _ref(i - i % 3), i)
+        else:
+            graph[f'n{i}'] = _node(kind, _ref(i - 2), _ref(i - 1))
+
+    return graph
+
+
+def layered(num_nodes: int, kind: str = 'noop', width: int = 100, seed: int = 0):
+    # Layers of `width` nodes, each node depends on two random nodes of the last layer
+    rng = random.Random(seed)
+    graph = {}
+    for i in range(num_nodes):
+        if(i < width):
+            graph[f'n{i}'] = _node(kind, i)
+        else:
+            base = i - i % width - width
+            graph[f'n{i}'] = _node(kind, _ref(base + rng.randrange(width)), _ref(base + rng.randrange(width)))
+
+    return graph
+
+
+SHAPES = {'chain': chain, 'fanout': fanout, 'diamond': diamond, 'layered': layered}
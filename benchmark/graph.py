@@ -0,0 +1,33 @@
+"""Measure Graph construction (including topological hashing) and compile time against node count.
+
+    python benchmark/graph.py --nodes 1000 10000 100000
+"""
+import argparse
+import os
+import sys
+from time import perf_counter
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+import moirae
+from benchmark.generators import chain, layered
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--nodes', type=int, nargs='+', default=[1000, 10000, 100000])
+    args = parser.parse_args()
+
+    print(f'{"nodes":>8} {"shape":<8} {"build(s)":>10} {"per node(us)":>14} {"compile(s)":>12}')
+    for num_nodes in args.nodes:
+        for shape, make_graph in (('chain', chain), ('layered', layered)):
+            definition = make_graph(num_nodes)
+
+            start = perf_counter()
+            graph = moirae.Graph(definition)
+            build = perf_counter() - start
+
+            start = perf_counter()
+            graph.compile()
+            compile_time = perf_counter() - start
+
+            print(f'{num_nodes:>8} {shape:<8} {build:>10.3f} {build / num_nodes * 1e6:>14.1f} {compile_time:>12.3f}')
@@ -0,0 +1,62 @@
+"""Compare `moirae.hash.stable_hash` with hashing compressed msgpack, on large literal inputs.
+
+    python benchmark/hash.py --size 10000000
+"""
+import argparse
+import hashlib
+import os
+import sys
+
+import lz4.frame
+import msgpack
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+import moirae
+from moirae.hash import stable_hash
+from benchmark.utils import timeit
+
+
+class HashConcat(moirae.Node):
+    class Input(moirae.Data):
+        blob: bytes
+        items: list[int]
+
+    class Output(moirae.Data):
+        o: int
+
+    async def execute(self, inputs: Input):
+        return self.Output(o=len(inputs.blob) + len(inputs.items))
+
+
+def compressed_hash(*args):
+    # Hashing scheme before the dedicated encoder: msgpack -> lz4 -> blake2b
+    return hashlib.blake2b(lz4.frame.compress(msgpack.packb(args))).hexdigest()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--size', type=int, default=10000000, help='Bytes of the blob literal.')
+    parser.add_argument('--nodes', type=int, default=20, help='Nodes with large literal inputs in the graph.')
+    args = parser.parse_args()
+
+    blob = os.urandom(args.size)
+    items = list(range(args.size // 100))
+    literals = {
+        'random bytes': (blob,),
+        'zero bytes': (bytes(args.size),),
+        'int list': (items,),
+        'nested': ([{'k': i, 'v': [i, str(i)]} for i in range(args.size // 1000)],),
+    }
+
+    print(f'{"input":<14} {"compressed(s)":>14} {"stable_hash(s)":>15} {"speedup":>8}')
+    for name, value in literals.items():
+        old, _ = timeit(compressed_hash, *value, repeat=5)
+        new, _ = timeit(stable_hash, *value, repeat=5)
+        print(f'{name:<14} {old:>14.4f} {new:>15.4f} {old / new:>7.1f}x')
+
+    definition = {f'n{i}': {
+        'node': 'HashConcat',
+        'arguments': {},
+        'inputs': {'blob': blob[i:], 'items': items}} for i in range(args.nodes)}
+    build, _ = timeit(moirae.Graph, definition, repeat=1)
+    print(f'Graph of {args.nodes} nodes with large literal inputs built in {build:.3f}s')
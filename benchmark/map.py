@@ -0,0 +1,100 @@
+"""Compare running one graph over many input sets with one `moirae.execute` per set, `moirae.execute_map`,
+and `moirae.execute_map` batching nodes with `execute_batch`.
+
+    python benchmark/map.py --sets 100 1000 --latency 0.001
+"""
+import argparse
+import os
+import sys
+import time
+from typing import ClassVar
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+import moirae
+from benchmark.utils import timeit, write_results
+
+
+class MapScale(moirae.Node):
+    class Input(moirae.Data):
+        x: float
+
+    class Output(moirae.Data):
+        o: float
+
+    async def execute(self, inputs: Input):
+        return self.Output(o=inputs.x * 2)
+
+
+class MapModel(moirae.Node):
+    # Blocking seconds per call, as a vectorized model with fixed overhead per call
+    latency: ClassVar[float] = 0.001
+
+    class Input(moirae.Data):
+        x: float
+
+    class Output(moirae.Data):
+        o: float
+
+    def execute(self, inputs: Input):
+        time.sleep(self.latency)
+        return self.Output(o=inputs.x + 1)
+
+
+class MapBatchModel(moirae.Node):
+    latency: ClassVar[float] = 0.001
+
+    class Input(moirae.Data):
+        x: float
+
+    class Output(moirae.Data):
+        o: float
+
+    def execute(self, inputs: Input):
+        time.sleep(self.latency)
+        return self.Output(o=inputs.x + 1)
+
+    def execute_batch(self, inputs: list[Input]):
+        time.sleep(self.latency)
+        return [self.Output(o=i.x + 1) for i in inputs]
+
+
+def map_graph(model: str):
+    return moirae.Graph({
+        'scale': {'node': 'MapScale', 'arguments': {}, 'inputs': {'x': 0.0}},
+        'model': {'node': model, 'arguments': {}, 'inputs': {'x': '${scale.o}'}},
+    })
+
+
+def run_each(graph: moirae.Graph, input_sets: list[dict]):
+    plan = graph.compile()
+    return [moirae.execute(plan.with_inputs(s)) for s in input_sets]
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--sets', type=int, nargs='+', default=[100, 1000])
+    parser.add_argument('--latency', type=float, default=0.001)
+    parser.add_argument('--concurrency', type=int, default=64)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--output', type=str, default=None, help='Write results to a JSON file')
+    args = parser.parse_args()
+
+    MapModel.latency = MapBatchModel.latency = args.latency
+
+    results = []
+    print(f'{"sets":>8} {"mode":<10} {"seconds":>10} {"sets/s":>10}')
+    for num_sets in args.sets:
+        input_sets = [{'scale': {'x': float(i)}} for i in range(num_sets)]
+        modes = (
+            ('each', run_each, map_graph('MapModel'), {}),
+            ('map', moirae.execute_map, map_graph('MapModel'), {'concurrency': args.concurrency}),
+            ('batch', moirae.execute_map, map_graph('MapBatchModel'), {'concurrency': args.concurrency}),
+        )
+        for name, func, graph, kwargs in modes:
+            seconds, _ = timeit(lambda: func(graph, input_sets, **kwargs), repeat=args.repeat)
+            results.append({'sets': num_sets, 'mode': name, 'seconds': seconds})
+            print(f'{num_sets:>8} {name:<10} {seconds:>10.4f} {num_sets / seconds:>10.1f}')
+
+    if(args.output):
+        write_results(args.output, 'map', results,
+            sets=args.sets, latency=args.latency, concurrency=args.concurrency, repeat=args.repeat)
@@ -0,0 +1,41 @@
+"""Compare per-node scheduling overhead and peak memory of the "latch" and "queue" schedulers.
+
+    python benchmark/scheduler.py --nodes 1000 10000 50000 --width 1000
+"""
+import argparse
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+import moirae
+from benchmark.generators import layered
+from benchmark.utils import measure, write_results
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--nodes', type=int, nargs='+', default=[1000, 10000, 50000])
+    parser.add_argument('--width', type=int, default=1000)
+    parser.add_argument('--max-concurrency', type=int, default=256)
+    parser.add_argument('--output', type=str, default=None, help='Also write results as JSON.')
+    args = parser.parse_args()
+
+    configs = [
+        ('latch', {'scheduler': 'latch'}),
+        ('queue', {'scheduler': 'queue'}),
+        (f'queue(max_concurrency={args.max_concurrency})', {'scheduler': 'queue', 'max_concurrency': args.max_concurrency}),
+        ('queue(critical_path)', {'scheduler': 'queue', 'max_concurrency': args.max_concurrency, 'priority': 'critical_path'}),
+    ]
+
+    results = []
+    print(f'{"nodes":>8} {"scheduler":<32} {"total(s)":>10} {"per node(us)":>14} {"peak mem(MiB)":>14}')
+    for num_nodes in args.nodes:
+        graph = moirae.Graph(layered(num_nodes, width=args.width))
+
+        for name, kwargs in configs:
+            elapsed, peak = measure(graph, **kwargs)
+            results.append({'nodes': num_nodes, 'scheduler': name, 'seconds': elapsed, 'peak_bytes': peak})
+            print(f'{num_nodes:>8} {name:<32} {elapsed:>10.3f} {elapsed / num_nodes * 1e6:>14.1f} {peak / 2 ** 20:>14.2f}')
+
+    if(args.output):
+        write_results(args.output, 'scheduler', results, **vars(args))
@@ -0,0 +1,64 @@
+"""Compare `moirae.serialize` with msgpack + lz4 of everything, on large binary outputs.
+
+    python benchmark/serialize.py --size 50000000
+"""
+import argparse
+import array
+import mmap
+import os
+import random
+import sys
+import tempfile
+
+import lz4.frame
+import msgpack
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+from moirae.serialize import serialize, serialize_chunks, deserialize
+from benchmark.utils import timeit
+
+
+def legacy_serialize(data):
+    # Encoding before the codec layer: msgpack -> lz4
+    return lz4.frame.compress(msgpack.packb(data))
+
+
+def legacy_deserialize(data):
+    return msgpack.unpackb(lz4.frame.decompress(data))
+
+
+def read_mmap(path: str):
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        return mmap.mmap(fd, 0, access=mmap.ACCESS_READ)
+    finally:
+        os.close(fd)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--size', type=int, default=50000000, help='Bytes of each binary output.')
+    args = parser.parse_args()
+
+    values = {
+        'random bytes': {'o': os.urandom(args.size)},
+        'zero bytes': {'o': bytes(args.size)},
+        'float array': {'o': array.array('d', (random.random() for _ in range(args.size // 8)))},
+    }
+
+    print(f'{"output":<14} {"scheme":<8} {"encode(s)":>10} {"decode(s)":>10} {"mmap decode(s)":>15} {"size(MB)":>9}')
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for name, value in values.items():
+            # msgpack cannot pack buffer-protocol objects other than bytes
+            legacy_value = {'o': bytes(value['o'])}
+            encode, data = timeit(legacy_serialize, legacy_value)
+            decode, _ = timeit(legacy_deserialize, data)
+            print(f'{name:<14} {"legacy":<8} {encode:>10.3f} {decode:>10.3f} {"-":>15} {len(data) / 1e6:>9.1f}')
+
+            encode, data = timeit(serialize, value)
+            decode, _ = timeit(deserialize, data)
+            path = os.path.join(tmp_dir, 'value')
+            with open(path, 'wb') as f:
+                f.writelines(serialize_chunks(value))
+            mmap_decode, _ = timeit(lambda: deserialize(read_mmap(path)))
+            print(f'{name:<14} {"moirae":<8} {encode:>10.3f} {decode:>10.3f} {mmap_decode:>15.3f} {len(data) / 1e6:>9.1f}')
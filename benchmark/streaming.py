@@ -0,0 +1,150 @@
+"""Compare latency and peak memory of a three-stage pipeline (read, transform, reduce) with whole outputs
+between stages and with streaming nodes passing chunks through channels, also with one node running at once.
+
+    python benchmark/streaming.py --chunks 10 100 --chunk-size 10000 --latency 0.001
+"""
+import argparse
+import asyncio
+import os
+import sys
+from typing import ClassVar
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+import moirae
+from benchmark.utils import measure, write_results
+
+
+class StreamingRead(moirae.Node):
+    # Seconds waiting for each chunk, as reading from a network or disk
+    latency: ClassVar[float] = 0.001
+
+    class Input(moirae.Data):
+        chunks: int
+        chunk_size: int
+
+    class Output(moirae.Data):
+        rows: list[int]
+
+    async def execute(self, inputs: Input):
+        for i in range(inputs.chunks):
+            await asyncio.sleep(self.latency)
+            yield self.Output(rows=list(range(i * inputs.chunk_size, (i + 1) * inputs.chunk_size)))
+
+
+class StreamingTransform(moirae.Node):
+    latency: ClassVar[float] = 0.001
+    stream_inputs = True
+
+    class Input(moirae.Data):
+        rows: list[int]
+
+    class Output(moirae.Data):
+        rows: list[int]
+
+    async def execute(self, inputs):
+        async for chunk in inputs:
+            await asyncio.sleep(self.latency)
+            yield self.Output(rows=[r * 2 for r in chunk.rows])
+
+
+class StreamingReduce(moirae.Node):
+    stream_inputs = True
+
+    class Input(moirae.Data):
+        rows: list[int]
+
+    class Output(moirae.Data):
+        total: int
+
+    async def execute(self, inputs):
+        total = 0
+        async for chunk in inputs:
+            total += sum(chunk.rows)
+        return self.Output(total=total)
+
+
+class BulkRead(moirae.Node):
+    latency: ClassVar[float] = 0.001
+
+    class Input(moirae.Data):
+        chunks: int
+        chunk_size: int
+
+    class Output(moirae.Data):
+        rows: list[int]
+
+    async def execute(self, inputs: Input):
+        rows = []
+        for i in range(inputs.chunks):
+            await asyncio.sleep(self.latency)
+            rows.extend(range(i * inputs.chunk_size, (i + 1) * inputs.chunk_size))
+        return self.Output(rows=rows)
+
+
+class BulkTransform(moirae.Node):
+    latency: ClassVar[float] = 0.001
+
+    class Input(moirae.Data):
+        rows: list[int]
+        chunk_size: int
+
+    class Output(moirae.Data):
+        rows: list[int]
+
+    async def execute(self, inputs: Input):
+        rows = []
+        for i in range(0, len(inputs.rows), inputs.chunk_size):
+            await asyncio.sleep(self.latency)
+            rows.extend(r * 2 for r in inputs.rows[i: i + inputs.chunk_size])
+        return self.Output(rows=rows)
+
+
+class BulkReduce(moirae.Node):
+    class Input(moirae.Data):
+        rows: list[int]
+
+    class Output(moirae.Data):
+        total: int
+
+    async def execute(self, inputs: Input):
+        return self.Output(total=sum(inputs.rows))
+
+
+def pipeline(prefix: str, chunks: int, chunk_size: int):
+    transform_inputs = {'rows': '${read.rows}'}
+    if(prefix == 'Bulk'):
+        transform_inputs['chunk_size'] = chunk_size
+
+    return moirae.Graph({
+        'read': {'node': f'{prefix}Read', 'arguments': {}, 'inputs': {'chunks': chunks, 'chunk_size': chunk_size}},
+        'transform': {'node': f'{prefix}Transform', 'arguments': {}, 'inputs': transform_inputs},
+        'reduce': {'node': f'{prefix}Reduce', 'arguments': {}, 'inputs': {'rows': '${transform.rows}'}},
+    })
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--chunks', type=int, nargs='+', default=[10, 100])
+    parser.add_argument('--chunk-size', type=int, default=10000)
+    parser.add_argument('--latency', type=float, default=0.001)
+    parser.add_argument('--channel-size', type=int, default=4)
+    parser.add_argument('--output', type=str, default=None, help='Write results to a JSON file')
+    args = parser.parse_args()
+
+    StreamingRead.latency = StreamingTransform.latency = args.latency
+    BulkRead.latency = BulkTransform.latency = args.latency
+
+    results = []
+    print(f'{"chunks":>8} {"mode":<10} {"total(s)":>10} {"peak mem(MiB)":>14}')
+    for chunks in args.chunks:
+        for name, prefix, limits in (('bulk', 'Bulk', {}), ('streaming', 'Streaming', {}),
+            ('stream/1', 'Streaming', {'scheduler': 'queue', 'max_concurrency': 1})):
+            # Only the reduced total is consumed, intermediate outputs are not kept
+            elapsed, peak = measure(pipeline(prefix, chunks, args.chunk_size),
+                targets=['reduce'], zero_copy=True, channel_size=args.channel_size, **limits)
+            results.append({'chunks': chunks, 'mode': name, 'seconds': elapsed, 'peak_bytes': peak})
+            print(f'{chunks:>8} {name:<10} {elapsed:>10.3f} {peak / 2 ** 20:>14.2f}')
+
+    if(args.output):
+        write_results(args.output, 'streaming', results,
+            chunks=args.chunks, chunk_size=args.chunk_size, latency=args.latency, channel_size=args.channel_size)
@@ -0,0 +1,129 @@
+"""Run the benchmark suite on synthetic workflows and write the results as JSON.
+
+Measures, for every shape and size:
+- graph: Graph construction, topological hashing and compile time
+- execute: per-node executor overhead and peak memory of each scheduler
+- cache: executing with a cold cache (all puts) and a warm cache (all hits) of the built-in caches
+
+    python -m benchmark.suite --sizes 10 100 1000 10000 100000 --output results.json
+"""
+import argparse
+import asyncio
+import gc
+import os
+import shutil
+import sys
+import tempfile
+from time import perf_counter
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+import moirae
+from benchmark.generators import SHAPES, KINDS
+from benchmark.utils import measure, drain, write_results
+
+
+def bench_graph(definition: dict):
+    gc.collect()
+    start = perf_counter()
+    graph = moirae.Graph(definition)
+    build = perf_counter() - start
+
+    # Hash again from scratch, node hashes are memoized
+    for _, node_data in graph.graph.nodes(data=True):
+        node_data['node']._hash = None
+    start = perf_counter()
+    graph._topological_hash()
+    hashing = perf_counter() - start
+
+    start = perf_counter()
+    graph.compile()
+    compile_time = perf_counter() - start
+
+    return graph, {
+        'edges': graph.graph.number_of_edges(),
+        'build_s': build,
+        'hash_s': hashing,
+        'compile_s': compile_time,
+    }
+
+
+def bench_execute(graph: moirae.Graph, scheduler: str):
+    elapsed, peak = measure(graph, scheduler=scheduler)
+    num_nodes = graph.graph.number_of_nodes()
+
+    return {
+        'scheduler': scheduler,
+        'seconds': elapsed,
+        'per_node_us': elapsed / num_nodes * 1e6,
+        'peak_mib': peak / 2 ** 20,
+    }
+
+
+def bench_cache(graph: moirae.Graph, make_cache):
+    cache = make_cache()
+    num_nodes = graph.graph.number_of_nodes()
+
+    timings = {}
+    for run in ('cold', 'warm'):
+        gc.collect()
+        start = perf_counter()
+        asyncio.run(drain(graph, cache=cache))
+        timings[run] = perf_counter() - start
+
+        if(run == 'cold'):
+            # Failed puts only warn, and would leave misses in the warm run
+            hashes = list(set(graph.compile().hashes))
+            cached = sum(r is True for r in asyncio.run(cache.exists_many(hashes)))
+            if(cached != len(hashes)):
+                raise RuntimeError(f"Only {cached}/{len(hashes)} outputs are cached by the cold run, cache puts failed.")
+
+    return {
+        'cold_s': timings['cold'],
+        'warm_s': timings['warm'],
+        'cold_nodes_per_s': num_nodes / timings['cold'],
+        'warm_nodes_per_s': num_nodes / timings['warm'],
+    }
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10, 100, 1000, 10000, 100000])
+    parser.add_argument('--shapes', nargs='+', choices=list(SHAPES), default=list(SHAPES))
+    parser.add_argument('--kinds', nargs='+', choices=list(KINDS), default=['noop'])
+    parser.add_argument('--benchmarks', nargs='+', choices=['graph', 'execute', 'cache'],
+        default=['graph', 'execute', 'cache'])
+    parser.add_argument('--schedulers', nargs='+', choices=['latch', 'queue'], default=['latch', 'queue'])
+    parser.add_argument('--output', type=str, default='benchmark-results.json')
+    args = parser.parse_args()
+
+    results = []
+
+    def report(record: dict):
+        results.append(record)
+        print(' '.join(f'{k}={v:.4g}' if isinstance(v, float) else f'{k}={v}' for k, v in record.items()), flush=True)
+
+    for kind in args.kinds:
+        for shape in args.shapes:
+            for num_nodes in args.sizes:
+                case = {'shape': shape, 'kind': kind, 'nodes': num_nodes}
+                graph, graph_result = bench_graph(SHAPES[shape](num_nodes, kind))
+                if('graph' in args.benchmarks):
+                    report({'benchmark': 'graph', **case, **graph_result})
+
+                if('execute' in args.benchmarks):
+                    for scheduler in args.schedulers:
+                        report({'benchmark': 'execute', **case, **bench_execute(graph, scheduler)})
+
+                if('cache' in args.benchmarks):
+                    report({'benchmark': 'cache', **case, 'cache': 'memory',
+                        **bench_cache(graph, lambda: moirae.MemoryCache(max_bytes=2 ** 30))})
+
+                    root_dir = tempfile.mkdtemp(prefix='moirae-bench-')
+                    try:
+                        report({'benchmark': 'cache', **case, 'cache': 'disk',
+                            **bench_cache(graph, lambda: moirae.DiskCache(root_dir))})
+                    finally:
+                        shutil.rmtree(root_dir, ignore_errors=True)
+
+    write_results(args.output, 'suite', results, **vars(args))
+    print(f'Results are written to {args.output}')
@@ -0,0 +1,72 @@
+import asyncio
+import gc
+import json
+import os
+import platform
+import subprocess
+import sys
+import tracemalloc
+from datetime import datetime, timezone
+from time import perf_counter
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+import moirae
+
+
+def timeit(func, *args, repeat: int = 3):
+    # Returns the best time of `repeat` calls and the result of the last call
+    best = float('inf')
+    result = None
+    for _ in range(repeat):
+        gc.collect()
+        start = perf_counter()
+        result = func(*args)
+        best = min(best, perf_counter() - start)
+
+    return best, result
+
+
+async def drain(graph: moirae.Graph, **kwargs):
+    async with moirae.Executor(graph, **kwargs) as exe:
+        async for _ in exe:
+            pass
+
+
+def measure(graph: moirae.Graph, **kwargs):
+    # Returns elapsed seconds and peak traced memory in bytes of running the graph, measured by separate runs.
+    gc.collect()
+    start = perf_counter()
+    asyncio.run(drain(graph, **kwargs))
+    elapsed = perf_counter() - start
+
+    gc.collect()
+    tracemalloc.start()
+    asyncio.run(drain(graph, **kwargs))
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return elapsed, peak
+
+
+def _git_revision():
+    try:
+        return subprocess.run(['git', 'rev-parse', 'HEAD'], cwd=os.path.dirname(__file__),
+            capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def write_results(path: str, benchmark: str, results: list[dict], **params):
+    """Write results as JSON, along with the environment to compare runs against each other."""
+    report = {
+        'benchmark': benchmark,
+        'time': datetime.now(timezone.utc).isoformat(),
+        'revision': _git_revision(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpus': os.cpu_count(),
+        'params': params,
+        'results': results,
+    }
+    with open(path, 'w') as f:
+        json.dump(report, f, indent=2)
@@ -0,0 +1,79 @@
+"""Measure the per-node overhead of validating inputs between nodes, with and without the trusted mode.
+
+    python benchmark/validation.py --nodes 100 1000 --items 100
+"""
+import argparse
+import asyncio
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+import moirae
+from benchmark.utils import timeit, drain, write_results
+
+
+class ValidationRecord(moirae.Data):
+    name: str
+    score: float
+
+
+class ValidationSource(moirae.Node):
+    class Input(moirae.Data):
+        items: int
+
+    class Output(moirae.Data):
+        values: list[int]
+        weights: dict[str, float]
+        records: list[ValidationRecord]
+
+    async def execute(self, inputs: Input):
+        return self.Output(
+            values=list(range(inputs.items)),
+            weights={str(i): float(i) for i in range(inputs.items)},
+            records=[ValidationRecord(name=str(i), score=float(i)) for i in range(inputs.items)])
+
+
+class ValidationRelay(moirae.Node):
+    class Input(moirae.Data):
+        values: list[int]
+        weights: dict[str, float]
+        records: list[ValidationRecord]
+
+    class Output(moirae.Data):
+        values: list[int]
+        weights: dict[str, float]
+        records: list[ValidationRecord]
+
+    async def execute(self, inputs: Input):
+        return self.Output.model_construct(values=inputs.values, weights=inputs.weights, records=inputs.records)
+
+
+def relay_chain(num_nodes: int, items: int):
+    graph = {'n0': {'node': 'ValidationSource', 'arguments': {}, 'inputs': {'items': items}}}
+    for i in range(1, num_nodes):
+        graph[f'n{i}'] = {'node': 'ValidationRelay', 'arguments': {}, 'inputs': {
+            'values': f'${{n{i - 1}.values}}', 'weights': f'${{n{i - 1}.weights}}', 'records': f'${{n{i - 1}.records}}'}}
+
+    return moirae.Graph(graph)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--nodes', type=int, nargs='+', default=[100, 1000])
+    parser.add_argument('--items', type=int, default=100)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--output', type=str, default=None, help='Write results to a JSON file')
+    args = parser.parse_args()
+
+    results = []
+    print(f'{"nodes":>8} {"mode":<10} {"seconds":>10} {"per node(us)":>14}')
+    for num_nodes in args.nodes:
+        graph = relay_chain(num_nodes, args.items)
+        graph.compile()
+        for name, trusted in (('validate', False), ('trusted', True)):
+            seconds, _ = timeit(lambda: asyncio.run(drain(graph, zero_copy=True, trusted=trusted)), repeat=args.repeat)
+            results.append({'nodes': num_nodes, 'mode': name, 'seconds': seconds})
+            print(f'{num_nodes:>8} {name:<10} {seconds:>10.4f} {seconds / num_nodes * 1e6:>14.1f}')
+
+    if(args.output):
+        write_results(args.output, 'validation', results, nodes=args.nodes, items=args.items, repeat=args.repeat)
@@ -1,5 +1,12 @@
-from moirae.data import Data
+from moirae.data import Data, FrozenData
 from moirae.node import Node, NODES
 from moirae.graph import Graph
-from moirae.cache import Cache, CacheIOError
-from moirae.executor import execute, Executor
+from moirae.plan import Plan
+from moirae.cache import Cache, CacheIOError, MemoryCache, DiskCache
+from moirae.trace import Tracer
+from moirae.scheduling import RuntimeStats
+from moirae.singleflight import SingleFlight
+from moirae.batching import Batcher
+from moirae.executor import execute, execute_map, Executor
+from moirae.service import ExecutorPool, PoolSaturated
+from moirae.distributed import Transport, StreamTransport, Coordinator, Worker, LocalCluster, RemoteError
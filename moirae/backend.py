@@ -0,0 +1,129 @@
+from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+import asyncio
+import importlib
+import inspect
+
+from moirae.serialize import serialize, deserialize
+
+
+def _run_sync(node, inputs, batch: bool = False):
+    # Run `execute` (or `execute_batch`) to completion in current thread, it can be either sync or async.
+    outputs = node.execute_batch(inputs) if batch else node.execute(inputs)
+    if(inspect.isawaitable(outputs)):
+        outputs = asyncio.run(outputs)
+
+    return outputs
+
+
+def _load_node_class(module_name: str, node_class_name: str):
+    from moirae.node import NODES
+
+    # Node classes are registered at import time, import the defining module if absent.
+    if(node_class_name not in NODES):
+        importlib.import_module(module_name)
+
+    return NODES[node_class_name]
+
+
+def _run_in_process(module_name: str, node_class_name: str, arguments: bytes, inputs: bytes, batch: bool = False):
+    node_class = _load_node_class(module_name, node_class_name)
+
+    node = node_class.model_validate(deserialize(arguments))
+    if(batch):
+        outputs = _run_sync(node, [node_class.Input.model_validate(i) for i in deserialize(inputs)], batch=True)
+        for o in outputs:
+            node.check_outputs(o)
+
+        return serialize([o.model_dump() for o in outputs])
+
+    outputs = _run_sync(node, node_class.Input.model_validate(deserialize(inputs)))
+    node.check_outputs(outputs)
+
+    return serialize(outputs.model_dump())
+
+
+class Backend(ABC):
+    # Whether `run` takes the topological hash of the node as keyword `hash_key`
+    takes_hash: bool = False
+
+    @abstractmethod
+    async def run(self, node, inputs):
+        raise NotImplementedError(f'"run" method of {self.__class__} is not implemented!')
+
+    async def run_batch(self, node, inputs: list):
+        # Run `execute_batch` over inputs of many runs, on the event loop unless overridden.
+        outputs = node.execute_batch(inputs)
+        if(inspect.isawaitable(outputs)):
+            outputs = await outputs
+
+        return outputs
+
+    def shutdown(self):
+        pass
+
+
+class AsyncBackend(Backend):
+    """Run `execute` on the event loop of the executor."""
+    def __init__(self, max_workers: int = None):
+        pass
+
+    async def run(self, node, inputs):
+        outputs = node.execute(inputs)
+        if(inspect.isawaitable(outputs)):
+            outputs = await outputs
+
+        return outputs
+
+
+class ThreadBackend(Backend):
+    """Run `execute` in a thread pool, for blocking or GIL-releasing nodes."""
+    def __init__(self, max_workers: int = None):
+        self.pool = ThreadPoolExecutor(max_workers)
+
+    async def run(self, node, inputs):
+        return await asyncio.get_running_loop().run_in_executor(self.pool, _run_sync, node, inputs)
+
+    async def run_batch(self, node, inputs: list):
+        return await asyncio.get_running_loop().run_in_executor(self.pool, _run_sync, node, inputs, True)
+
+    def shutdown(self):
+        self.pool.shutdown(wait=False)
+
+
+class ProcessBackend(Backend):
+    """Run `execute` in a process pool, for CPU-bound nodes.
+    Node arguments, inputs and outputs are shipped with `moirae.serialize`."""
+    def __init__(self, max_workers: int = None):
+        self.pool = ProcessPoolExecutor(max_workers)
+
+    async def run(self, node, inputs):
+        node_class = node.__class__
+        outputs = await asyncio.get_running_loop().run_in_executor(self.pool, _run_in_process,
+            node_class.__module__,
+            node_class.__name__,
+            serialize(node.model_dump()),
+            serialize(inputs.model_dump()))
+
+        return node.Output.model_validate(deserialize(outputs))
+
+    async def run_batch(self, node, inputs: list):
+        node_class = node.__class__
+        outputs = await asyncio.get_running_loop().run_in_executor(self.pool, _run_in_process,
+            node_class.__module__,
+            node_class.__name__,
+            serialize(node.model_dump()),
+            serialize([i.model_dump() for i in inputs]),
+            True)
+
+        return [node.Output.model_validate(o) for o in deserialize(outputs)]
+
+    def shutdown(self):
+        self.pool.shutdown(wait=False)
+
+
+BACKENDS = {
+    'async': AsyncBackend,
+    'thread': ThreadBackend,
+    'process': ProcessBackend,
+}
@@ -0,0 +1,93 @@
+import asyncio
+
+
+class Batcher:
+    """Coalesce executions of batchable nodes (defining `Node.execute_batch`) with the same arguments into one
+    `execute_batch` call. Shared by executors running the same graph over many input sets on one event loop.
+    Inputs are collected until the event loop goes idle (or `delay` seconds), or a batch is full."""
+    def __init__(self, max_batch_size: int = 256, delay: float = 0.0):
+        if(max_batch_size < 1):
+            raise ValueError("max_batch_size should be >= 1")
+        if(delay < 0):
+            raise ValueError("delay should be >= 0")
+
+        self.max_batch_size = max_batch_size
+        self.delay = delay
+        # (node hash, backend id) -> [node, backend, [(inputs, future), ...]]
+        self._pending = {}
+        self._tasks = set()
+        # Statistics: number of `execute_batch` calls and inputs executed by them
+        self.stats = {'batches': 0, 'inputs': 0}
+
+    def submit(self, node, inputs, backend):
+        # Returns a future of the outputs of `node` on `inputs`.
+        loop = asyncio.get_running_loop()
+        key = (node.hash, id(backend))
+        future = loop.create_future()
+
+        entry = self._pending.get(key)
+        if(entry is None):
+            entry = self._pending[key] = [node, backend, []]
+            if(self.delay):
+                loop.call_later(self.delay, self._flush, key, entry)
+            else:
+                loop.call_soon(self._flush, key, entry)
+        entry[2].append((inputs, future))
+
+        if(len(entry[2]) >= (node.max_batch_size or self.max_batch_size)):
+            self._flush(key, entry)
+
+        return future
+
+    def _flush(self, key, entry):
+        # Already flushed because it is full
+        if(self._pending.get(key) is not entry):
+            return
+        del self._pending[key]
+
+        task = asyncio.get_running_loop().create_task(self._run(*entry))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, node, backend, items):
+        # Inputs of cancelled waiters are not executed
+        items = [(i, f) for i, f in items if not f.done()]
+        if(not items):
+            return
+
+        try:
+            outputs = await backend.run_batch(node, [i for i, _ in items])
+            if(len(outputs) != len(items)):
+                raise ValueError(f"execute_batch of {node.__class__} returned {len(outputs)} outputs for {len(items)} inputs.")
+        except Exception as e:
+            if(len(items) == 1):
+                self._resolve(items[0][1], exception=e)
+                return
+
+            # Retry input by input, so a bad input only fails its own run
+            await asyncio.gather(*(self._run_one(node, backend, i, f) for i, f in items))
+            return
+        except BaseException as e:
+            for _, f in items:
+                self._resolve(f, exception=e)
+            raise
+
+        self.stats['batches'] += 1
+        self.stats['inputs'] += len(items)
+        for (_, f), o in zip(items, outputs):
+            self._resolve(f, o)
+
+    async def _run_one(self, node, backend, inputs, future):
+        try:
+            self._resolve(future, await backend.run(node, inputs))
+        except BaseException as e:
+            self._resolve(future, exception=e)
+
+    @staticmethod
+    def _resolve(future, outputs=None, exception: BaseException = None):
+        if(future.done()):
+            return
+        if(exception is None):
+            future.set_result(outputs)
+        else:
+            future.set_exception(exception)
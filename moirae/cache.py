@@ -1,6 +1,13 @@
 from abc import ABC, abstractmethod
+from collections import OrderedDict
+import asyncio
+import mmap
+import os
+import tempfile
+import threading
 
 from moirae import Data
+from moirae.serialize import serialize, deserialize
 
 
 class Cache(ABC):
@@ -17,6 +24,405 @@ class Cache(ABC):
     async def put(self, hash_key: str, data_value: bytes):
         raise NotImplementedError(f'"put" method of {self.__class__} is not implemented!')
 
+    async def load(self, hash_key: str):
+        # Get the deserialized object, caches holding objects can skip deserializing.
+        return deserialize(await self.get(hash_key))
+
+    async def dump(self, hash_key: str, obj):
+        # Put the object, caches holding objects can keep it along with the serialized value.
+        await self.put(hash_key, serialize(obj))
+
+    # Batched methods. They fall back to the single-key methods, caches with bulk operations
+    # (remote or database backed) should override them.
+    # The results of `exists_many`, `get_many` and `load_many` are in the order of `hash_keys`, and the results of
+    # `put_many` and `dump_many` (None for stored keys) in the order of `items`. Failed keys are returned as their
+    # exceptions instead of failing the whole batch.
+    async def exists_many(self, hash_keys: list[str]):
+        return await asyncio.gather(*map(self.exists, hash_keys), return_exceptions=True)
+
+    async def get_many(self, hash_keys: list[str]):
+        return await asyncio.gather(*map(self.get, hash_keys), return_exceptions=True)
+
+    async def put_many(self, items: list[tuple[str, bytes]]):
+        return await asyncio.gather(*(self.put(hash_key, data_value) for hash_key, data_value in items),
+            return_exceptions=True)
+
+    async def load_many(self, hash_keys: list[str]):
+        return [v if isinstance(v, BaseException) else _try_deserialize(v) for v in await self.get_many(hash_keys)]
+
+    async def dump_many(self, items: list[tuple[str, object]]):
+        values = [_try_serialize(obj) for _, obj in items]
+        serialized = [(hash_key, v) for (hash_key, _), v in zip(items, values) if not isinstance(v, BaseException)]
+        results = iter(await self.put_many(serialized) or [None] * len(serialized))
+
+        return [v if isinstance(v, BaseException) else next(results) for v in values]
+
+
+def _try_serialize(obj):
+    try:
+        return serialize(obj)
+    except Exception as e:
+        return e
+
+
+def _try_deserialize(data_value: bytes):
+    try:
+        return deserialize(data_value)
+    except Exception as e:
+        return e
+
 
 class CacheIOError(IOError):
     pass
+
+
+class MemoryCache(Cache):
+    """In-process cache evicting by total bytes of serialized values.
+    It is thread-safe, so it can be shared by executors running in different threads or event loops."""
+    def __init__(self, max_bytes: int = 256 * 2 ** 20, policy: str = 'lru', store_objects: bool = False):
+        if(max_bytes < 0):
+            raise ValueError("max_bytes should be >= 0")
+        if(policy not in ('lru', 'lfu')):
+            raise ValueError(f'Unknown eviction policy {policy}. Available policies are ["lru", "lfu"].')
+
+        self.max_bytes = max_bytes
+        self.policy = policy
+        # Also keep deserialized objects put by `dump`, so `load` skips deserializing.
+        # Objects are shared by all loads, do not mutate them.
+        self.store_objects = store_objects
+
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        # hash_key -> [data_value, obj, frequency]
+        self._entries = {}
+        # LRU: Keys in order of recency. LFU: frequency -> keys in order of recency.
+        self._order = OrderedDict()
+        self._freqs = {}
+        self._min_freq = 0
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def stats(self):
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'size': self.size,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+            }
+
+    def _touch(self, hash_key: str, entry: list):
+        if(self.policy == 'lru'):
+            self._order.move_to_end(hash_key)
+
+            return
+
+        freq = entry[2]
+        keys = self._freqs[freq]
+        del keys[hash_key]
+        if(not keys):
+            del self._freqs[freq]
+            if(self._min_freq == freq):
+                self._min_freq = freq + 1
+        entry[2] = freq + 1
+        self._freqs.setdefault(freq + 1, OrderedDict())[hash_key] = None
+
+    def _insert(self, hash_key: str, entry: list):
+        self._entries[hash_key] = entry
+        self.size += len(entry[0])
+
+        if(self.policy == 'lru'):
+            self._order[hash_key] = None
+        else:
+            self._freqs.setdefault(entry[2], OrderedDict())[hash_key] = None
+            if(len(self._entries) == 1 or entry[2] < self._min_freq):
+                self._min_freq = entry[2]
+
+    def _remove(self, hash_key: str):
+        entry = self._entries.pop(hash_key)
+        self.size -= len(entry[0])
+
+        if(self.policy == 'lru'):
+            del self._order[hash_key]
+        else:
+            keys = self._freqs[entry[2]]
+            del keys[hash_key]
+            if(not keys):
+                del self._freqs[entry[2]]
+
+    def _evict(self):
+        while(self.size > self.max_bytes):
+            if(self.policy == 'lru'):
+                hash_key = next(iter(self._order))
+            else:
+                while(self._min_freq not in self._freqs):
+                    self._min_freq += 1
+                hash_key = next(iter(self._freqs[self._min_freq]))
+
+            self._remove(hash_key)
+            self.evictions += 1
+
+    def _lookup(self, hash_key: str):
+        with self._lock:
+            entry = self._entries.get(hash_key)
+            if(entry is None):
+                self.misses += 1
+                raise CacheIOError(f"No cache for hash {hash_key}.")
+
+            self.hits += 1
+            self._touch(hash_key, entry)
+
+            return entry
+
+    def _store(self, hash_key: str, data_value: bytes, obj):
+        if(len(data_value) > self.max_bytes):
+            return
+
+        with self._lock:
+            freq = 1
+            if(hash_key in self._entries):
+                freq = self._entries[hash_key][2]
+                self._remove(hash_key)
+
+            self._insert(hash_key, [data_value, obj, freq])
+            self._evict()
+
+    async def exists(self, hash_key: str):
+        with self._lock:
+            if(hash_key in self._entries):
+                return True
+
+            self.misses += 1
+
+            return False
+
+    async def get(self, hash_key: str):
+        return self._lookup(hash_key)[0]
+
+    async def put(self, hash_key: str, data_value: bytes):
+        self._store(hash_key, bytes(data_value), None)
+
+    async def load(self, hash_key: str):
+        data_value, obj, _ = self._lookup(hash_key)
+        if(obj is None):
+            return deserialize(data_value)
+
+        return obj
+
+    async def dump(self, hash_key: str, obj):
+        self._store(hash_key, serialize(obj), obj if self.store_objects else None)
+
+    async def exists_many(self, hash_keys: list[str]):
+        with self._lock:
+            results = [hash_key in self._entries for hash_key in hash_keys]
+            self.misses += results.count(False)
+
+            return results
+
+    def _lookup_many(self, hash_keys: list[str]):
+        entries = []
+        with self._lock:
+            for hash_key in hash_keys:
+                entry = self._entries.get(hash_key)
+                if(entry is None):
+                    self.misses += 1
+                    entries.append(CacheIOError(f"No cache for hash {hash_key}."))
+                else:
+                    self.hits += 1
+                    self._touch(hash_key, entry)
+                    entries.append(entry)
+
+        return entries
+
+    async def get_many(self, hash_keys: list[str]):
+        return [e if isinstance(e, BaseException) else e[0] for e in self._lookup_many(hash_keys)]
+
+    def _store_or_exception(self, hash_key: str, data_value: bytes, obj):
+        try:
+            self._store(hash_key, data_value, obj)
+        except Exception as e:
+            return e
+
+    async def put_many(self, items: list[tuple[str, bytes]]):
+        return [self._store_or_exception(hash_key, bytes(data_value), None) for hash_key, data_value in items]
+
+    async def load_many(self, hash_keys: list[str]):
+        return [e if isinstance(e, BaseException) else (_try_deserialize(e[0]) if e[1] is None else e[1])
+            for e in self._lookup_many(hash_keys)]
+
+    async def dump_many(self, items: list[tuple[str, object]]):
+        results = []
+        for hash_key, obj in items:
+            value = _try_serialize(obj)
+            results.append(value if isinstance(value, BaseException)
+                else self._store_or_exception(hash_key, value, obj if self.store_objects else None))
+
+        return results
+
+
+class DiskCache(Cache):
+    """Content-addressed cache on local disk.
+    Values are stored in directories sharded by the prefix of hash keys, written atomically
+    (write to a temporary file then rename), and read by mmap.
+    With `max_bytes`, least recently used values are garbage collected when the quota is exceeded."""
+    def __init__(self, root_dir: str, max_bytes: int = None, shard_depth: int = 2, shard_width: int = 2,
+        fsync: bool = False):
+        if(max_bytes is not None and max_bytes < 0):
+            raise ValueError("max_bytes should be >= 0")
+
+        self.root_dir = root_dir
+        self.max_bytes = max_bytes
+        self.shard_depth = shard_depth
+        self.shard_width = shard_width
+        self.fsync = fsync
+
+        self.size = 0
+        # Access index: hash_key -> size, in order of recency. Loaded lazily only when `max_bytes` is set.
+        self._index = None
+        self._lock = threading.Lock()
+
+        os.makedirs(root_dir, exist_ok=True)
+
+    def __getstate__(self):
+        # Shipped to other processes (e.g. workers) as its settings, the index is rebuilt there.
+        state = dict(self.__dict__)
+        state.update(_index=None, _lock=None, size=0)
+
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+    def _path(self, hash_key: str):
+        shards = [hash_key[i * self.shard_width: (i + 1) * self.shard_width] for i in range(self.shard_depth)]
+
+        return os.path.join(self.root_dir, *shards, hash_key)
+
+    def _load_index(self):
+        # Rebuild the access order from modification times, which are refreshed on reads.
+        entries = []
+        for dir_path, _, file_names in os.walk(self.root_dir):
+            for file_name in file_names:
+                if(file_name.startswith('.tmp-')):
+                    continue
+                try:
+                    st = os.stat(os.path.join(dir_path, file_name))
+                except FileNotFoundError:
+                    continue
+                entries.append((st.st_mtime, file_name, st.st_size))
+
+        entries.sort()
+        self._index = OrderedDict((hash_key, size) for _, hash_key, size in entries)
+        self.size = sum(self._index.values())
+
+    def _ensure_index(self):
+        if(self.max_bytes is not None and self._index is None):
+            with self._lock:
+                if(self._index is None):
+                    self._load_index()
+
+    def _exists(self, hash_key: str):
+        self._ensure_index()
+        if(self._index is not None and hash_key in self._index):
+            return True
+
+        return os.path.exists(self._path(hash_key))
+
+    def _get(self, hash_key: str):
+        self._ensure_index()
+        path = self._path(hash_key)
+        try:
+            fd = os.open(path, os.O_RDONLY)
+        except FileNotFoundError as e:
+            raise CacheIOError(f"No cache for hash {hash_key}.") from e
+
+        try:
+            if(os.fstat(fd).st_size == 0):
+                data_value = b''
+            else:
+                data_value = mmap.mmap(fd, 0, access=mmap.ACCESS_READ)
+        finally:
+            os.close(fd)
+
+        if(self.max_bytes is not None):
+            os.utime(path)
+            with self._lock:
+                if(hash_key in self._index):
+                    self._index.move_to_end(hash_key)
+
+        return data_value
+
+    def _put(self, hash_key: str, data_value: bytes):
+        self._ensure_index()
+        path = self._path(hash_key)
+        dir_path = os.path.dirname(path)
+        os.makedirs(dir_path, exist_ok=True)
+
+        fd, tmp_path = tempfile.mkstemp(dir=dir_path, prefix='.tmp-')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data_value)
+                if(self.fsync):
+                    f.flush()
+                    os.fsync(f.fileno())
+            os.replace(tmp_path, path)
+        except BaseException:
+            try:
+                os.unlink(tmp_path)
+            except FileNotFoundError:
+                pass
+            raise
+
+        if(self.max_bytes is not None):
+            self._account(hash_key, len(data_value))
+
+    def _account(self, hash_key: str, size: int):
+        with self._lock:
+            self.size += size - self._index.pop(hash_key, 0)
+            self._index[hash_key] = size
+
+            # Garbage collect least recently used values
+            while(self.size > self.max_bytes and len(self._index) > 1):
+                victim, victim_size = self._index.popitem(last=False)
+                self.size -= victim_size
+                try:
+                    os.unlink(self._path(victim))
+                except FileNotFoundError:
+                    pass
+
+    async def exists(self, hash_key: str):
+        return await asyncio.to_thread(self._exists, hash_key)
+
+    async def get(self, hash_key: str):
+        return await asyncio.to_thread(self._get, hash_key)
+
+    async def put(self, hash_key: str, data_value: bytes):
+        await asyncio.to_thread(self._put, hash_key, data_value)
+
+    def _get_or_exception(self, hash_key: str):
+        try:
+            return self._get(hash_key)
+        except Exception as e:
+            return e
+
+    async def exists_many(self, hash_keys: list[str]):
+        return await asyncio.to_thread(lambda: [self._exists(k) for k in hash_keys])
+
+    async def get_many(self, hash_keys: list[str]):
+        return await asyncio.to_thread(lambda: [self._get_or_exception(k) for k in hash_keys])
+
+    def _put_or_exception(self, hash_key: str, data_value: bytes):
+        try:
+            self._put(hash_key, data_value)
+        except Exception as e:
+            return e
+
+    async def put_many(self, items: list[tuple[str, bytes]]):
+        return await asyncio.to_thread(lambda: [self._put_or_exception(k, v) for k, v in items])
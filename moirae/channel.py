@@ -0,0 +1,37 @@
+import asyncio
+
+
+# Marks the end of a stream
+_END = object()
+
+
+class Channel:
+    """Bounded queue of chunks from a streaming node to one consumer. The producer waits once `size` chunks
+    are not consumed yet, like a pipe."""
+    def __init__(self, size: int):
+        self._queue = asyncio.Queue(size)
+        self.closed = False
+
+    async def put(self, chunk):
+        # Chunks after the consumer closed the channel are dropped
+        if(not self.closed):
+            await self._queue.put(chunk)
+
+    async def end(self):
+        await self.put(_END)
+
+    def close(self):
+        # The consumer stops receiving, unblock the producer
+        self.closed = True
+        while(not self._queue.empty()):
+            self._queue.get_nowait()
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        chunk = await self._queue.get()
+        if(chunk is _END):
+            raise StopAsyncIteration
+
+        return chunk
@@ -1,7 +1,7 @@
 import hashlib
 import pickle
 
-from pydantic import BaseModel
+from pydantic import BaseModel, ConfigDict
 
 from moirae.hash import stable_hash
 
@@ -9,5 +9,10 @@ from moirae.hash import stable_hash
 class Data(BaseModel):
     @property
     def hash(self):
-        return stable_hash(self.__dict__.items())
+        return stable_hash(sorted(self.__dict__.items(), key=lambda x: x[0]))
+
+
+class FrozenData(Data):
+    # Fields cannot be re-assigned, suitable for outputs shared by reference in zero-copy mode.
+    model_config = ConfigDict(frozen=True)
 
@@ -0,0 +1,318 @@
+from abc import ABC, abstractmethod
+import asyncio
+import multiprocessing
+import struct
+import traceback
+from warnings import warn
+
+from moirae.backend import Backend, BACKENDS, _load_node_class
+from moirae.cache import Cache
+from moirae.serialize import serialize, deserialize
+
+
+# Length prefix of messages
+_HEADER = struct.Struct('>Q')
+
+
+class RemoteError(RuntimeError):
+    # A node failed in a worker, with the formatted traceback of the worker.
+    pass
+
+
+class Transport(ABC):
+    """Bidirectional channel of messages (bytes) between a coordinator and a worker."""
+
+    @abstractmethod
+    async def send(self, message: bytes):
+        raise NotImplementedError(f'"send" method of {self.__class__} is not implemented!')
+
+    @abstractmethod
+    async def recv(self):
+        # Returns the next message, raises EOFError once the peer closed the channel.
+        raise NotImplementedError(f'"recv" method of {self.__class__} is not implemented!')
+
+    def close(self):
+        pass
+
+
+class StreamTransport(Transport):
+    """Length-prefixed messages over an asyncio stream, e.g. a TCP or Unix socket."""
+    def __init__(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.reader = reader
+        self.writer = writer
+        self._lock = asyncio.Lock()
+
+    @classmethod
+    async def connect(cls, host: str, port: int):
+        return cls(*await asyncio.open_connection(host, port))
+
+    async def send(self, message: bytes):
+        async with self._lock:
+            self.writer.writelines((_HEADER.pack(len(message)), message))
+            await self.writer.drain()
+
+    async def recv(self):
+        try:
+            size, = _HEADER.unpack(await self.reader.readexactly(_HEADER.size))
+            return await self.reader.readexactly(size)
+        except (asyncio.IncompleteReadError, ConnectionError) as e:
+            raise EOFError("The transport is closed.") from e
+
+    def close(self):
+        self.writer.close()
+
+
+class Coordinator(Backend):
+    """Backend shipping nodes to connected workers, as (Node class name, arguments, Input) payloads serialized by
+    `moirae.serialize`. The executor keeps scheduling and dataflow, and outputs of workers are fed back to it.
+    Each node goes to the worker with the fewest nodes in flight, nodes of a lost worker are sent to others."""
+    takes_hash = True
+
+    def __init__(self):
+        # Transport -> ids of tasks in flight on it
+        self._workers = {}
+        # task id -> [message, future, transport]
+        self._tasks = {}
+        self._next_id = 0
+        self._changed = asyncio.Condition()
+        # Receiving and re-dispatching tasks
+        self._background = set()
+        self._server = None
+
+    def __len__(self):
+        return len(self._workers)
+
+    async def listen(self, host: str = '127.0.0.1', port: int = 0):
+        """Accept workers over TCP, returns the bound (host, port)."""
+        self._server = await asyncio.start_server(
+            lambda reader, writer: self.add_worker(StreamTransport(reader, writer)), host, port)
+
+        return self._server.sockets[0].getsockname()[:2]
+
+    def add_worker(self, transport: Transport):
+        self._workers[transport] = set()
+        self._spawn(self._receive(transport))
+        self._spawn(self._notify())
+
+    def _spawn(self, coro):
+        task = asyncio.get_running_loop().create_task(coro)
+        self._background.add(task)
+        task.add_done_callback(self._background.discard)
+
+    async def _notify(self):
+        async with self._changed:
+            self._changed.notify_all()
+
+    async def wait_for_workers(self, num_workers: int, timeout: float = None):
+        async def wait():
+            async with self._changed:
+                await self._changed.wait_for(lambda: len(self._workers) >= num_workers)
+
+        await asyncio.wait_for(wait(), timeout)
+
+    async def run(self, node, inputs, hash_key: str = None):
+        node_class = node.__class__
+        message = serialize([self._next_id, node_class.__module__, node_class.__name__, hash_key,
+            node.model_dump(), inputs.model_dump()])
+        task_id = self._next_id
+        self._next_id += 1
+
+        future = asyncio.get_running_loop().create_future()
+        self._tasks[task_id] = [message, future, None]
+        try:
+            await self._dispatch(task_id)
+            error, outputs = await future
+        finally:
+            entry = self._tasks.pop(task_id)
+            if(entry[2] in self._workers):
+                self._workers[entry[2]].discard(task_id)
+
+        if(error is not None):
+            raise RemoteError(f"Node {node_class} failed in the worker:\n{error}")
+
+        return node.Output.model_validate(deserialize(outputs))
+
+    async def run_batch(self, node, inputs: list):
+        # Inputs are spread over workers one by one
+        return await asyncio.gather(*(self.run(node, i) for i in inputs))
+
+    async def _dispatch(self, task_id: int):
+        entry = self._tasks[task_id]
+        while(not self._workers):
+            async with self._changed:
+                await self._changed.wait_for(lambda: self._workers)
+
+        transport = min(self._workers, key=lambda t: len(self._workers[t]))
+        entry[2] = transport
+        self._workers[transport].add(task_id)
+        try:
+            await transport.send(entry[0])
+        except Exception as e:
+            warn(f"Error sending a node to a worker, exception {e}", stacklevel=2)
+            self._lose(transport)
+
+    def _lose(self, transport: Transport):
+        # Send nodes in flight on a lost worker to other workers
+        if(transport not in self._workers):
+            return
+
+        task_ids = self._workers.pop(transport)
+        transport.close()
+        for task_id in task_ids:
+            if(task_id in self._tasks and not self._tasks[task_id][1].done()):
+                self._spawn(self._dispatch(task_id))
+
+    async def _receive(self, transport: Transport):
+        try:
+            while(True):
+                task_id, error, outputs = deserialize(await transport.recv())
+                if(transport in self._workers):
+                    self._workers[transport].discard(task_id)
+                entry = self._tasks.get(task_id)
+                if(entry is not None and not entry[1].done()):
+                    entry[1].set_result((error, outputs))
+        except EOFError:
+            pass
+        finally:
+            self._lose(transport)
+
+    def shutdown(self):
+        if(self._server is not None):
+            self._server.close()
+            self._server = None
+        for transport in list(self._workers):
+            transport.close()
+        self._workers = {}
+        for t in list(self._background):
+            t.cancel()
+        for _, future, _ in self._tasks.values():
+            if(not future.done()):
+                future.set_exception(RuntimeError("The coordinator is shut down."))
+
+
+class Worker:
+    """Execute nodes shipped by a `Coordinator`. Node classes are looked up in `NODES` by name, importing their
+    modules if absent. With `cache`, outputs already in the shared cache are returned without computing."""
+    def __init__(self, cache: Cache = None, backend: str = 'async', max_workers: int = None, concurrency: int = 64):
+        if(backend not in BACKENDS):
+            raise ValueError(f"Unknown backend {backend}. Available backends are {list(BACKENDS)}.")
+        if(concurrency < 1):
+            raise ValueError("concurrency should be >= 1")
+
+        self.cache = cache
+        self.backend = backend
+        self.max_workers = max_workers
+        # Maximum number of nodes executing at once in the worker
+        self.concurrency = concurrency
+        self.backends = {}
+        self.stats = {'executed': 0, 'cache_hits': 0, 'failed': 0}
+
+    async def connect(self, host: str, port: int):
+        await self.serve(await StreamTransport.connect(host, port))
+
+    async def serve(self, transport: Transport):
+        """Execute nodes received from the transport until it is closed."""
+        slots = asyncio.Semaphore(self.concurrency)
+        tasks = set()
+        try:
+            while(True):
+                try:
+                    message = await transport.recv()
+                except EOFError:
+                    break
+
+                await slots.acquire()
+                task = asyncio.get_running_loop().create_task(self._handle(transport, message))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+                task.add_done_callback(lambda _: slots.release())
+        finally:
+            for t in tasks:
+                t.cancel()
+            for b in self.backends.values():
+                b.shutdown()
+            self.backends = {}
+            transport.close()
+
+    async def _handle(self, transport: Transport, message: bytes):
+        task_id, module_name, node_class_name, hash_key, arguments, inputs = deserialize(message)
+        try:
+            reply = [task_id, None, await self._execute(module_name, node_class_name, hash_key, arguments, inputs)]
+        except Exception:
+            self.stats['failed'] += 1
+            reply = [task_id, traceback.format_exc(), None]
+
+        try:
+            await transport.send(serialize(reply))
+        except Exception as e:
+            warn(f"Error replying to the coordinator, exception {e}", stacklevel=2)
+
+    async def _execute(self, module_name: str, node_class_name: str, hash_key: str, arguments: dict, inputs: dict):
+        # Returns serialized outputs, which is also the format of cache values
+        if(self.cache is not None and hash_key is not None):
+            try:
+                if(await self.cache.exists(hash_key)):
+                    outputs = await self.cache.get(hash_key)
+                    self.stats['cache_hits'] += 1
+
+                    return outputs
+            except Exception as e:
+                warn(f"Error getting cache for hash {hash_key}，exception {e}", stacklevel=2)
+
+        node_class = _load_node_class(module_name, node_class_name)
+        node = node_class.model_validate(arguments)
+        data = node_class.Input.model_validate(inputs)
+        node.check_inputs(data)
+
+        backend = node.backend or self.backend
+        if(backend not in self.backends):
+            self.backends[backend] = BACKENDS[backend](self.max_workers)
+        outputs = await self.backends[backend].run(node, data)
+        node.check_outputs(outputs)
+        self.stats['executed'] += 1
+
+        return serialize(outputs.model_dump())
+
+
+def run_worker(host: str, port: int, **kwargs):
+    """Entry of worker processes, connect to the coordinator at (host, port) and serve until it closes."""
+    asyncio.run(Worker(**kwargs).connect(host, port))
+
+
+class LocalCluster:
+    """A coordinator with `num_workers` worker processes on this machine connected over local sockets.
+    Use the coordinator as the backend of executors. Keyword arguments are passed to `Worker`."""
+    def __init__(self, num_workers: int = None, start_timeout: float = 30.0, mp_context: str = None, **worker_kwargs):
+        self.num_workers = num_workers or multiprocessing.cpu_count()
+        self.start_timeout = start_timeout
+        self.mp_context = multiprocessing.get_context(mp_context)
+        self.worker_kwargs = worker_kwargs
+        self.coordinator = None
+        self.processes = []
+
+    async def __aenter__(self):
+        self.coordinator = Coordinator()
+        host, port = await self.coordinator.listen('127.0.0.1', 0)
+        self.processes = [self.mp_context.Process(target=run_worker, args=(host, port),
+                kwargs=self.worker_kwargs, daemon=True)
+            for _ in range(self.num_workers)]
+        for p in self.processes:
+            p.start()
+
+        try:
+            await self.coordinator.wait_for_workers(self.num_workers, self.start_timeout)
+        except BaseException:
+            await self.__aexit__(None, None, None)
+            raise
+
+        return self.coordinator
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        # Workers exit once their connections are closed
+        self.coordinator.shutdown()
+        loop = asyncio.get_running_loop()
+        for p in self.processes:
+            await loop.run_in_executor(None, p.join, 5)
+            if(p.is_alive()):
+                p.terminate()
+        self.processes = []
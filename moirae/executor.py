@@ -1,25 +1,162 @@
 from copy import deepcopy
+from collections import deque
 import asyncio
+import heapq
+from time import perf_counter
+from typing import Mapping, Union
 from warnings import warn
-import networkx as nx
 
 from moirae.latch import Latch
-from moirae.serialize import serialize, deserialize
-from moirae import Graph, Node, Data, Cache, CacheIOError
+from moirae.channel import Channel
+from moirae.spill import SpillStore, sizeof
+from moirae.backend import Backend, BACKENDS
+from moirae.trace import Tracer
+from moirae.scheduling import RuntimeStats, critical_path
+from moirae.singleflight import SingleFlight, FlightAbandoned, flight_group
+from moirae.serialize import serialize
+from moirae.batching import Batcher
+from moirae import Graph, Plan, Node, Data, Cache, CacheIOError
 
 
 class Executor:
-    def __init__(self, graph: Graph,
-        cache: Cache = None, timeout: float = None, return_exceptions: bool = False):
-        assert isinstance(graph, Graph)
+    def __init__(self, graph: Union[Graph, Plan],
+        cache: Cache = None, timeout: float = None, return_exceptions: bool = False,
+        backend: Union[str, Backend] = 'async', backends: dict[str, Backend] = None, max_workers: int = None,
+        scheduler: str = 'latch', max_concurrency: int = None, priority: str = 'fifo',
+        runtimes: Union[RuntimeStats, dict[str, float]] = None, node_concurrency: dict[str, int] = None,
+        zero_copy: bool = False,
+        cache_batch_size: int = 64, cache_flush_interval: float = 0.1, prefetch_window: int = 8,
+        write_behind: bool = False, write_queue_size: int = 1024,
+        serialize_in_thread: bool = False, prune: bool = False, targets: list[str] = None,
+        memory_budget: int = None, spill_threshold: int = 2 ** 20, spill_dir: str = None,
+        trace: Union[bool, Tracer] = False, single_flight: Union[bool, SingleFlight] = True,
+        batcher: Batcher = None, reuse: Union['Executor', Mapping[str, Data]] = None, keep_results: bool = False,
+        node_limiter: asyncio.Semaphore = None, trusted: bool = False, channel_size: int = 16):
+        assert isinstance(graph, (Graph, Plan))
+        if(scheduler not in ('latch', 'queue')):
+            raise ValueError(f'Unknown scheduler {scheduler}. Available schedulers are ["latch", "queue"].')
+        if(max_concurrency is not None and scheduler != 'queue'):
+            raise ValueError('"max_concurrency" is only supported by the "queue" scheduler.')
+        if(max_concurrency is not None and max_concurrency < 1):
+            raise ValueError("max_concurrency should be >= 1")
+        if(priority not in ('fifo', 'critical_path')):
+            raise ValueError(f'Unknown priority {priority}. Available priorities are ["fifo", "critical_path"].')
+        if(priority != 'fifo' and scheduler != 'queue'):
+            raise ValueError('"priority" is only supported by the "queue" scheduler.')
+        if(node_concurrency is not None and any(v < 1 for v in node_concurrency.values())):
+            raise ValueError("Limits of node_concurrency should be >= 1")
+        if(cache_flush_interval is not None and cache_flush_interval < 0):
+            raise ValueError("cache_flush_interval should be >= 0")
+        if(prefetch_window < 1):
+            raise ValueError("prefetch_window should be >= 1")
+        if(write_queue_size < 1):
+            raise ValueError("write_queue_size should be >= 1")
+        if(channel_size < 1):
+            raise ValueError("channel_size should be >= 1")
+        if(not isinstance(backend, Backend) and backend not in BACKENDS):
+            raise ValueError(f"Unknown backend {backend}. Available backends are {list(BACKENDS)}.")
 
         self.cache = cache
+        # Number of keys per batched cache call. Cache puts are coalesced and flushed in batches of this size,
+        # or `cache_flush_interval` seconds after the first of a batch, so other runs see them without waiting
+        # for the batch to fill. None flushes only full batches and the rest at the end of the run.
+        self.cache_batch_size = cache_batch_size
+        self.cache_flush_interval = cache_flush_interval
+        # Outputs of hit nodes are fetched in batches in the background while nodes run. At most `prefetch_window`
+        # batches are fetched or held ahead of the nodes taking them, hit nodes not reached yet fetch their own.
+        self.prefetch_window = prefetch_window
+        # Put cache in a background task through a queue of at most `write_queue_size` outputs, nodes wait
+        # only when the queue is full. The queue is flushed on exit of the executor or by `flush`.
+        self.write_behind = write_behind
+        self.write_queue_size = write_queue_size
+        # Serialize outputs to put in a worker thread instead of the event loop
+        self.serialize_in_thread = serialize_in_thread
+        self._writer = None
+        # Walk backwards from the sink nodes after checking cache, skip nodes whose every consumer
+        # is a cache hit. Skipped nodes are neither executed, fetched nor streamed.
+        self.prune = prune
+        # Nodes with the same hash wait for the one in flight instead of executing again. By default, shared by
+        # executors of the same cache (or only within this executor without cache).
+        if(isinstance(single_flight, SingleFlight)):
+            self.single_flight = single_flight
+        else:
+            self.single_flight = flight_group(cache) if single_flight else None
         self.timeout = timeout
         self.return_exceptions = return_exceptions
 
-        self.graph = deepcopy(graph.graph)
-        self.input_data = deepcopy(graph.input_data)
+        # Default backend for nodes without `Node.backend`
+        self.backend = backend
+        # Backends passed in are shared, backends created by the executor are shut down on exit.
+        self.backends = dict(backends) if backends else {}
+        self.max_workers = max_workers
+        self._owned_backends = []
+
+        # "latch": Spawn one task per node up front, each waits on its own latch.
+        # "queue": Keep in-degree counters, only spawn tasks for ready nodes, at most `max_concurrency` in flight.
+        self.scheduler = scheduler
+        self.max_concurrency = max_concurrency
+        # Order of ready nodes in the "queue" scheduler. "fifo": in order of readiness.
+        # "critical_path": longest remaining path to the sinks first, weighted by runtime estimates of node classes.
+        self.priority = priority
+        # Runtime estimates of node classes, recorded by this executor. Share it to keep estimates across runs.
+        if(isinstance(runtimes, dict)):
+            runtimes = RuntimeStats(runtimes)
+        self.runtimes = RuntimeStats() if runtimes is None and priority == 'critical_path' else runtimes
+
+        # Share outputs by reference between nodes and with the consumer of `outputs`,
+        # only copy them for nodes with `Node.mutates_inputs`.
+        self.zero_copy = zero_copy
+
+        # Outputs waiting for downstream nodes are reference counted by remaining consumers, and released
+        # once the last one consumed it. When they take more than `memory_budget` bytes, values larger than
+        # `spill_threshold` bytes are spilled to a temporary directory under `spill_dir`.
+        self.memory_budget = memory_budget
+        self.spill_threshold = spill_threshold
+        self.spill_dir = spill_dir
+
+        # Record spans of the run, see `moirae.Tracer`. Nothing is timed without it.
+        self.tracer = trace if isinstance(trace, Tracer) else (Tracer() if trace else None)
+
+        # Batchable nodes are executed through `batcher` together with the same nodes of other executors sharing it
+        self.batcher = batcher
+        # Bound the number of nodes executing at once across executors sharing the semaphore
+        self.node_limiter = node_limiter
+        # Construct inputs fed only by upstream outputs without validating them again: types of connected fields
+        # are checked by `Graph`, and outputs by `Node.check_outputs`. Nodes with literal inputs are still validated.
+        self.trusted = trusted
+
+        # Keep outputs of the run in `results` as {hash: outputs}, to be reused by later runs
+        self.keep_results = keep_results
+        self.results = None
+        # Outputs of a previous run (an executor with `keep_results` or {hash: outputs}). Nodes of the same hash
+        # take them as cache hits, without executing or fetching them.
+        self.reuse = reuse
+
+        # A compiled plan can be shared by many executors
+        self.plan = graph if isinstance(graph, Plan) else graph.compile()
+        # Node class name -> maximum number of its nodes executing at once, from `Node.max_concurrency`
+        # and overridden by `node_concurrency`. Cache hits are not limited.
+        self.node_concurrency = {type(n).__name__: n.max_concurrency
+            for n in self.plan.nodes if n.max_concurrency is not None}
+        self.node_concurrency.update(node_concurrency or {})
+        # Streaming nodes send chunks to consumers with `Node.stream_inputs` through channels of at most
+        # `channel_size` chunks, producers and consumers run at once.
+        self.channel_size = channel_size
+        # node_id -> upstream node streaming to it, or None
+        self._stream_sources = self._plan_streams()
+        # Function building the `Input` of each node from collected values
+        self._input_builders = [_input_builder(n.Input, trusted and len(inflow) == len(n.input_fields))
+            for n, inflow in zip(self.plan.nodes, self.plan.inflow)]
+        # node_id -> requested output fields (None for whole outputs). Only ancestors of targets are run,
+        # and only targets are streamed.
+        self.targets = self._resolve_targets(targets) if targets is not None else None
+        # Literal inputs are copied from the plan, or shared with it in zero-copy mode unless the node mutates them.
+        # Slots of edges are filled during execution.
+        self.input_data = [deepcopy(dict(d)) if(not self.zero_copy or n.mutates_inputs) else dict(d)
+            for n, d in zip(self.plan.nodes, self.plan.input_data)]
         self.outputs = asyncio.Queue()
+        # Statistics of the last run
+        self.stats = {'cache_puts': 0, 'cache_put_failures': 0, 'cache_put_errors': []}
 
     async def __aenter__(self):
         self.done = False
@@ -32,11 +169,21 @@ class Executor:
 
     async def __aexit__(self, exc_type, exc_val, exc_tb):
         for t in self.tasks:
-            if(not t.done):
-                await t.cancel()
+            if(not t.done()):
+                t.cancel()
+
+        if(not self.execution.done()):
+            self.execution.cancel()
+
+        if(exc_type is not None and issubclass(exc_type, asyncio.CancelledError)):
+            if(self._writer is not None):
+                self._writer.cancel()
+        else:
+            await self.flush()
 
-        if(not self.execution.done):
-            await self.execution.cancel()
+        for b in self._owned_backends:
+            b.shutdown()
+        self._owned_backends = []
 
         if(exc_type):
             return False
@@ -47,85 +194,622 @@ class Executor:
     async def __anext__(self):
         result = await self.outputs.get()
 
-        if self.done:
+        if result is None:
             raise StopAsyncIteration
 
         return result
 
+    @classmethod
+    async def map(cls, graph: Union[Graph, Plan], input_sets, concurrency: int = 64,
+        batcher: Union[bool, Batcher] = True, **kwargs):
+        """Execute the graph over many input sets, each is a dict of {node_name: {input_field: value}} overriding
+        literal inputs. Yields (index, {node_name: outputs}) as each input set completes.
+        The graph is compiled once, and backends, deduplication and batching are shared by the runs."""
+        if(concurrency < 1):
+            raise ValueError("concurrency should be >= 1")
+
+        plan = graph if isinstance(graph, Plan) else graph.compile()
+        if(batcher is True):
+            batcher = Batcher() if any(n.batchable() for n in plan.nodes) else None
+        kwargs['batcher'] = batcher or None
+
+        # Create backends once instead of per run
+        owned_backends = []
+        backends = dict(kwargs.get('backends') or {})
+        for n in plan.nodes:
+            name = n.backend or kwargs.get('backend', 'async')
+            if(isinstance(name, str) and name not in backends):
+                backends[name] = BACKENDS[name](kwargs.get('max_workers'))
+                owned_backends.append(backends[name])
+        kwargs['backends'] = backends
+        # Runs without cache deduplicate nodes in flight among themselves
+        if(kwargs.get('cache') is None and kwargs.get('single_flight', True) is True):
+            kwargs['single_flight'] = SingleFlight()
+
+        async def run(index: int, overrides: dict):
+            async with cls(plan.with_inputs(overrides), **kwargs) as exe:
+                outputs = {node_name: node_output async for (node_name, node_output) in exe}
+                await exe.execution
+
+            return index, outputs
+
+        pending = set()
+        try:
+            for index, overrides in enumerate(input_sets):
+                task = asyncio.create_task(run(index, overrides))
+                # Errors of runs left behind by a failed one are not reported
+                task.add_done_callback(lambda t: t.cancelled() or t.exception())
+                pending.add(task)
+                if(len(pending) < concurrency):
+                    continue
+
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for t in done:
+                    yield t.result()
+
+            while(pending):
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for t in done:
+                    yield t.result()
+        finally:
+            for t in pending:
+                t.cancel()
+            for b in owned_backends:
+                b.shutdown()
+
+    def _resolve_targets(self, targets: list[str]):
+        # Targets are "node_name" or "node_name.output_field"
+        resolved = {}
+        for target in targets:
+            node_name, _, output_field = target.partition('.')
+            if(node_name not in self.plan.index):
+                raise ValueError(f"No <node id={node_name}> of target {target}.")
+
+            node_id = self.plan.index[node_name]
+            if(not output_field):
+                resolved[node_id] = None
+                continue
+
+            if(output_field not in self.plan.nodes[node_id].output_fields):
+                raise NameError(f"""Not existed field {output_field} in {self.plan.nodes[node_id].Output} of target {target}.
+                    The output fields are {self.plan.nodes[node_id].output_fields}""")
+            if(node_id not in resolved):
+                resolved[node_id] = []
+            if(resolved[node_id] is not None):
+                resolved[node_id].append(output_field)
+
+        return resolved
+
+    def _plan_streams(self):
+        # A consumer is streamed by its only streaming upstream node. The head of a streaming chain waits for
+        # other upstream nodes of the chain, so a consumer is not streamed if one of them depends on the head.
+        successors = self.plan.successors
+        sources = [None] * len(self.plan)
+        heads = {}
+        for i, node in enumerate(self.plan.nodes):
+            if(not node.stream_inputs):
+                continue
+            producers = [p for p in self.plan.predecessors[i] if self.plan.nodes[p].streaming()]
+            if(len(producers) != 1):
+                continue
+            head = heads.get(producers[0], producers[0])
+
+            # Node ids are in topological order, descendants of the head reaching the consumer are below it
+            stack = [s for s in successors[head] if s < i]
+            visited = set()
+            while(stack):
+                s = stack.pop()
+                if(s in visited):
+                    continue
+                visited.add(s)
+                stack.extend(t for t in successors[s] if t < i)
+            if(not visited.intersection(p for p in self.plan.predecessors[i] if p != producers[0])):
+                sources[i] = producers[0]
+                heads[i] = head
+
+        return sources
+
+    def _plan_demand(self):
+        # Decide which nodes are needed in this run, and which of them are executed instead of fetched from cache.
+        hashes = self.plan.hashes
+        num_nodes = len(self.plan)
+
+        if(not self.prune and self.targets is None):
+            self._needed = [True] * num_nodes
+            self._executing = [h not in self.available_cache for h in hashes]
+            if(all(self._executing) and all(s is None for s in self._stream_sources)):
+                # Nodes each node waits for, and nodes waiting for each node
+                self._waits = self.plan.predecessors
+                self._waiters = self.plan.successors
+
+                return
+
+            # Cache hits are prefetched, they wait for nothing.
+            needed = self._needed
+            executing = self._executing
+        else:
+            needed, executing = self._plan_pruned()
+
+        waits = [self.plan.predecessors[i] if executing[i] else () for i in range(num_nodes)]
+        # Heads of streaming chains also wait for other upstream nodes of the chain, to start with its consumers
+        heads = {}
+        for i, source in enumerate(self._stream_sources):
+            if(source is None or not executing[i] or not executing[source]):
+                continue
+            head = heads[i] = heads.get(source, source)
+            extra = [p for p in self.plan.predecessors[i] if p != source and p not in waits[head]]
+            if(extra):
+                waits[head] = (*waits[head], *extra)
+        waiters = [[] for _ in range(num_nodes)]
+        for i, w in enumerate(waits):
+            for p in w:
+                waiters[p].append(i)
+
+        self._needed = needed
+        self._executing = executing
+        self._waits = waits
+        self._waiters = waiters
+
+    def _plan_pruned(self):
+        # Walk backwards from targets or sinks, only executed nodes need their upstream
+        hashes = self.plan.hashes
+        num_nodes = len(self.plan)
+
+        needed = [False] * num_nodes
+        executing = [False] * num_nodes
+        if(self.targets is not None):
+            stack = list(self.targets)
+        else:
+            stack = [i for i in range(num_nodes) if not self.plan.successors[i]]
+        while(stack):
+            i = stack.pop()
+            if(needed[i]):
+                continue
+
+            needed[i] = True
+            if(hashes[i] not in self.available_cache):
+                executing[i] = True
+                stack.extend(self.plan.predecessors[i])
+
+        return needed, executing
+
     def _plan_latch(self):
-        for node_name in self.graph.nodes:
-            predcessors = set(self.graph.predecessors(node_name))
-            latch = Latch(len(predcessors))
-
-            self.graph.nodes(data=True)[node_name]['latch'] = latch
-            # Add hook to predcessors for counting down
-            for p in predcessors:
-                if('latch_to_countdown' not in self.graph.nodes(data=True)[p]):
-                    self.graph.nodes(data=True)[p]['latch_to_countdown'] = []
-                self.graph.nodes(data=True)[p]['latch_to_countdown'].append(latch)
-
-    def _plan_dataflow(self):
-        dataflows = {}
-        for out_node, in_node, out_edge in self.graph.out_edges(data=True):
-            if(out_node not in dataflows):
-                dataflows[out_node] = {}
-            if(out_edge['output_field'] not in dataflows[out_node]):
-                dataflows[out_node][out_edge['output_field']] = []
-
-            dataflows[out_node][out_edge['output_field']].append((in_node, out_edge['input_field']))
-
-        # (out_field: [(in_node, in_field)])
-        for out_node, in_nodes in dataflows.items():
-            self.graph.nodes(data=True)[out_node]['dataflow'] = in_nodes
-
-    def _dispatch_tasks(self):
-        self._plan_latch()
-        self._plan_dataflow()
+        self._latches = [Latch(len(w)) if n else None for w, n in zip(self._waits, self._needed)]
+        self._semaphores = {k: asyncio.Semaphore(v) for k, v in self.node_concurrency.items()}
+
+    def _plan_ready_queue(self):
+        # Number of unfinished predcessors of each node
+        self._in_degrees = [len(w) for w in self._waits]
+        ready = [i for i, d in enumerate(self._in_degrees) if d == 0 and self._needed[i]]
+        if(self.priority == 'critical_path'):
+            # Cache hits take no time
+            weights = [self.runtimes.estimate(type(n).__name__) if e else 0.0
+                for n, e in zip(self.plan.nodes, self._executing)]
+            self._ranks = critical_path(weights, self._waiters)
+            self._ready = [(-self._ranks[i], i) for i in ready]
+            heapq.heapify(self._ready)
+        else:
+            self._ready = deque(ready)
+
+        # Class name of executing nodes limited by `node_concurrency`, or None
+        self._limited_classes = [type(n).__name__ if e and type(n).__name__ in self.node_concurrency else None
+            for n, e in zip(self.plan.nodes, self._executing)]
+        self._class_running = {k: 0 for k in self.node_concurrency}
+        # Ready nodes held back by the limit of their class
+        self._deferred = {k: deque() for k in self.node_concurrency}
+        # Class counted by each task against its limit, or None
+        self._task_classes = {}
+        # Tasks of stream consumers, not counted against the limits
+        self._stream_tasks = set()
+        if(self.tracer is not None):
+            # Time each node becomes ready, to record its waiting in the queue
+            self._ready_at = [perf_counter()] * len(self.plan)
+        self._remaining = sum(self._needed)
+        self._failure = None
+        self._finished = asyncio.Event()
 
-        # Create coroutines
-        coroutines = []
+        if(not self._remaining):
+            self._finished.set()
 
-        for node_name, node_data in self.graph.nodes(data=True):
-            coroutines.append(
-                self._node_worker(node_name,
-                    node_data['node'],
-                    node_data['dataflow'] if 'dataflow' in node_data else {},
-                    node_data['latch'],
-                    node_data['latch_to_countdown'] if 'latch_to_countdown' in node_data else [],
-                    node_data['hash']))
+    def _schedule_late(self, node_id: int, waits: int):
+        # Schedule a node after the run started, waiting for `waits` upstream nodes
+        self._remaining += 1
+        if(self.scheduler == 'latch'):
+            self._latches[node_id] = Latch(waits)
+            self._spawn_worker(node_id)
 
-        return coroutines
+            return
+
+        self._in_degrees[node_id] = waits
+        class_name = type(self.plan.nodes[node_id]).__name__
+        self._limited_classes[node_id] = class_name if(self._executing[node_id]
+            and class_name in self.node_concurrency) else None
+        if(not waits):
+            if(self.tracer is not None):
+                self._ready_at[node_id] = perf_counter()
+            self._push_ready(node_id)
+
+    async def _check_cache(self, hashes: list[str]):
+        try:
+            results = await self.cache.exists_many(hashes)
+        except Exception as e:
+            warn(f"Error checking cache，exception {e}", stacklevel=2)
+
+            return set()
+
+        available_cache = set()
+        for hash_key, is_valid in zip(hashes, results):
+            if(isinstance(is_valid, BaseException)):
+                warn(f"Error checking cache for hash {hash_key}，exception {is_valid}", stacklevel=2)
+            elif(is_valid):
+                available_cache.add(hash_key)
+
+        return available_cache
+
+    async def _prefetch_cache(self):
+        # Fetch outputs of cache hits in batches, at most `prefetch_window` batches at once. Hashes awaited by their
+        # nodes go first, others are fetched in order of their nodes while at most `prefetch_window` batches of
+        # values are fetched or held ahead of the nodes taking them. Runs until cancelled at the end of the run,
+        # as hits scheduled late are demanded while it runs.
+        limit = self.prefetch_window * self.cache_batch_size
+        window = asyncio.Semaphore(self.prefetch_window)
+        tasks = set()
+        try:
+            while(True):
+                batch = self._next_batch(self._demanded, self.cache_batch_size)
+                if(not batch and self._held + self.cache_batch_size <= limit):
+                    batch = self._next_batch(self._ahead, limit - self._held)
+                if(not batch):
+                    self._wake.clear()
+                    await self._wake.wait()
+                    continue
 
-    async def _check_cache(self):
-        hashes = {n[1]['hash'] for n in self.graph.nodes(data=True)}
+                self._held += len(batch)
+                await window.acquire()
+                task = asyncio.create_task(self._load_batch(batch))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+                task.add_done_callback(lambda _: window.release())
+        finally:
+            for t in tasks:
+                t.cancel()
 
-        async def check_cache_wrapper(hash_key: str):
+    def _next_batch(self, hashes: deque, limit: int):
+        # Nodes of the same hash may demand it more than once
+        batch = []
+        while(hashes and len(batch) < min(self.cache_batch_size, limit)):
+            hash_key = hashes.popleft()
+            if(hash_key not in self._requested):
+                self._requested.add(hash_key)
+                batch.append(hash_key)
+
+        return batch
+
+    async def _load_batch(self, batch: list[str]):
+        # Resolve futures of the batch with validated outputs, or with exceptions for failed keys
+        tracer = self.tracer
+        start = perf_counter() if tracer is not None else None
+        try:
+            values = await self.cache.load_many(batch)
+        except Exception as e:
+            warn(f"Error getting cache，exception {e}", stacklevel=2)
+            values = [e] * len(batch)
+        if(tracer is not None):
+            tracer.record('get', 'cache', start=start, keys=len(batch))
+
+        for hash_key, value in zip(batch, values):
+            start = perf_counter() if tracer is not None else None
+            node_id = self._hit_nodes[hash_key]
             try:
-                return await self.cache.exists(hash_key)
+                if(isinstance(value, BaseException)):
+                    raise value
+                value = self.plan.nodes[node_id].Output.model_validate(value)
             except Exception as e:
-                warn(f"Error checking cache for hash {hash_key}，exception {e}", stacklevel=2)
+                warn(f"Error getting cache for hash {hash_key}，exception {e}", stacklevel=2)
+                value = e
+            if(tracer is not None):
+                tracer.record('validate', 'node', self.plan.names[node_id], start)
+            future = self._fetches.get(hash_key)
+            if(future is not None and not future.done()):
+                future.set_result(value)
+
+    async def _take_hit(self, node_id: int):
+        # Outputs of a cache hit, or the exception if they failed to fetch
+        hash_key = self.plan.hashes[node_id]
+        future = self._fetches[hash_key]
+        if(not future.done()):
+            if(hash_key not in self._requested):
+                # Not reached by the prefetcher yet, fetch it first
+                self._demanded.append(hash_key)
+                self._wake.set()
+            await future
+        outputs = future.result()
+
+        self._prefetch_refs[hash_key] -= 1
+        if(not self._prefetch_refs[hash_key] and hash_key in self._requested):
+            # Outputs from `reuse` are kept for nodes scheduled late
+            del self._fetches[hash_key]
+            self._held -= 1
+            if(self._ahead):
+                self._wake.set()
+        if(not isinstance(outputs, BaseException)):
+            self._release_frontier(node_id)
+
+        return outputs
+
+    def _frontier(self, node_id: int):
+        # Scheduled upstream nodes of a hit reached through nodes not scheduled, whose outputs are kept until the hit
+        # is taken, in case it fails to fetch and runs as a miss
+        frontier = []
+        stack = list(self.plan.predecessors[node_id])
+        visited = set()
+        while(stack):
+            p = stack.pop()
+            if(p in visited):
+                continue
+            visited.add(p)
+            if(self._needed[p]):
+                frontier.append(p)
+                self._fallback_refs[p] = self._fallback_refs.get(p, 0) + 1
+            else:
+                stack.extend(self.plan.predecessors[p])
+
+        return frontier
+
+    def _release_frontier(self, node_id: int):
+        for p in self._frontiers.pop(node_id, ()):
+            self._fallback_refs[p] -= 1
+            if(not self._fallback_refs[p]):
+                del self._fallback_refs[p]
+                if(p not in self._late):
+                    self._kept.pop(p, None)
+
+    def _fall_back(self, node_id: int):
+        # Run a hit failed to fetch as a miss, scheduling its upstream not scheduled yet once in this run:
+        # as hits if they are cached, else executed after their own upstream.
+        self._failed.add(self.plan.hashes[node_id])
+        stack = [node_id]
+        while(stack):
+            i = stack.pop()
+            hash_key = self.plan.hashes[i]
+            self._late.add(i)
+            waits = 0
+            if(hash_key in self.available_cache and hash_key not in self._failed):
+                if(hash_key not in self._fetches):
+                    self._fetches[hash_key] = asyncio.get_running_loop().create_future()
+                    # Taken by other nodes before, demanded again
+                    self._requested.discard(hash_key)
+                self._prefetch_refs[hash_key] = self._prefetch_refs.get(hash_key, 0) + 1
+                self._hit_nodes.setdefault(hash_key, i)
+                self._frontiers[i] = self._frontier(i)
+            else:
+                self._executing[i] = True
+                for p in self.plan.predecessors[i]:
+                    if(p in self._kept):
+                        # Dispatched already
+                        self._dispatch_kept(p, i)
+                        continue
+                    if(not self._needed[p]):
+                        self._needed[p] = True
+                        self._fallback_upstream.add(p)
+                        stack.append(p)
+                    self._waiters[p].append(i)
+                    waits += 1
+            if(self.tracer is not None):
+                self.tracer.cache_status[self.plan.names[i]] = 'miss' if self._executing[i] else 'hit'
+            self._schedule_late(i, waits)
+
+        # Outputs of its upstream are taken or awaited by now
+        self._release_frontier(node_id)
+
+    def _dispatch_kept(self, node_id: int, consumer: int):
+        outputs = self._kept[node_id]
+        for _, out_node, output_field in self.plan.inflow[consumer]:
+            if(out_node != node_id):
+                continue
+            entry = self._values.get((node_id, output_field))
+            if(entry is not None):
+                entry[1] += 1
+                continue
+
+            data = getattr(outputs, output_field)
+            size = sizeof(data) if self.memory_budget is not None else 0
+            self._values[(node_id, output_field)] = [data, 1, size, None]
+            self._pending_bytes += size
+
+    def _record_put_failures(self, failures: list[tuple[str, BaseException]]):
+        self.stats['cache_put_failures'] += len(failures)
+        self.stats['cache_put_errors'].extend(failures)
+        if(not self.write_behind):
+            for hash_key, e in failures:
+                warn(f"Error putting cache for hash {hash_key}，exception {e}", stacklevel=2)
+
+    async def _write_batch(self, batch: list[tuple[str, Data]]):
+        start = perf_counter() if self.tracer is not None else None
+        items = batch
+        try:
+            if(self.serialize_in_thread):
+                items, failures = await asyncio.to_thread(_serialize_outputs, batch)
+                if(failures):
+                    self._record_put_failures(failures)
+                results = await self.cache.put_many(items)
+            else:
+                items = [(hash_key, outputs.model_dump()) for hash_key, outputs in batch]
+                results = await self.cache.dump_many(items)
+        except Exception as e:
+            self._record_put_failures([(hash_key, e) for hash_key, _ in items])
+        else:
+            # Caches overriding the batched methods may return nothing for a stored batch
+            failures = [(hash_key, r) for (hash_key, _), r in zip(items, results or ()) if isinstance(r, BaseException)]
+            if(failures):
+                self._record_put_failures(failures)
+            self.stats['cache_puts'] += len(items) - len(failures)
+
+        if(self.tracer is not None):
+            self.tracer.record('put', 'cache', start=start, keys=len(batch))
+
+    async def _flush_cache(self):
+        if(self._flush_timer is not None):
+            self._flush_timer.cancel()
+            self._flush_timer = None
+        if(not self._pending_puts):
+            return
+
+        items = list(self._pending_puts.items())
+        self._pending_puts = {}
+        await self._write_batch(items)
+
+    async def _put_cache(self, hash_key: str, outputs: Data):
+        if(self.write_behind):
+            # Wait only if the queue is full
+            await self._put_queue.put((hash_key, outputs))
+
+            return
 
-                return False
+        # Coalesced in batches
+        self._pending_puts[hash_key] = outputs
+        if(len(self._pending_puts) >= self.cache_batch_size):
+            await self._flush_cache()
+        elif(self._flush_timer is None and self.cache_flush_interval is not None):
+            self._flush_timer = asyncio.get_running_loop().call_later(self.cache_flush_interval, self._flush_later)
 
-        return {h for h, is_valid in zip(hashes, await asyncio.gather(*map(check_cache_wrapper, hashes)))
-            if is_valid}
+    def _flush_later(self):
+        self._flush_timer = None
+        task = asyncio.create_task(self._flush_cache())
+        self._flushes.add(task)
+        task.add_done_callback(self._flushes.discard)
+
+    async def _write_behind(self):
+        # Put batches of queued outputs until the None sentinel
+        while(True):
+            item = await self._put_queue.get()
+            if(item is None):
+                return
+
+            batch = [item]
+            while(len(batch) < self.cache_batch_size and not self._put_queue.empty()):
+                item = self._put_queue.get_nowait()
+                if(item is None):
+                    break
+                batch.append(item)
+
+            await self._write_batch(batch)
+            if(item is None):
+                return
+
+    async def flush(self):
+        # Wait for queued cache puts in the write-behind mode
+        if(self._writer is None):
+            return
+
+        writer = self._writer
+        self._writer = None
+        if(not writer.done()):
+            await self._put_queue.put(None)
+        await writer
 
     async def execute(self):
-        if(self.cache):
-            self.available_cache = await self._check_cache()
+        # hash_key -> future of outputs of cache hits, from `reuse` or fetched from cache
+        self._fetches = {}
+        # hash_key -> outputs waiting to be put in batch, timer of flushing them, and flushes running by the timer
+        self._pending_puts = {}
+        self._flush_timer = None
+        self._flushes = set()
+        self.stats = {'cache_puts': 0, 'cache_put_failures': 0, 'cache_put_errors': []}
+        if(self.cache is not None and self.write_behind and self._writer is None):
+            self._put_queue = asyncio.Queue(self.write_queue_size)
+            self._writer = asyncio.create_task(self._write_behind())
+        # (node_id, output_field) -> [value, remaining consumers, size, spilled path]
+        self._values = {}
+        self._pending_bytes = 0
+        self._spill = SpillStore(self.spill_dir)
+        # consumer node_id -> channel from its streaming upstream node
+        self._channels = {}
+        # node_id -> consumers released when it started streaming
+        self._streamed = {}
 
-        self.tasks = [asyncio.create_task(coro) for coro in self._dispatch_tasks()]
-        exc = None
+        tracer = self.tracer
+        run_start = perf_counter() if tracer is not None else None
 
-        for task in asyncio.as_completed(self.tasks):
-            try:
-                result = await task
-            # except TimeoutError:
-            #    pass
-            except BaseException as e:
-                exc = e
+        loop = asyncio.get_running_loop()
+        reuse = self.reuse.results if isinstance(self.reuse, Executor) else self.reuse
+        if(reuse):
+            for h in set(self.plan.hashes):
+                if(h in reuse):
+                    self._fetches[h] = loop.create_future()
+                    self._fetches[h].set_result(reuse[h])
+        self.results = {} if self.keep_results else None
 
-                break
+        self.available_cache = set(self._fetches)
+        hashes = [h for h in set(self.plan.hashes) if h not in self._fetches]
+        if(self.cache is not None and hashes):
+            start = perf_counter() if tracer is not None else None
+            self.available_cache |= await self._check_cache(hashes)
+            if(tracer is not None):
+                tracer.record('check', 'cache', start=start, keys=len(hashes))
+        self._plan_demand()
+
+        if(tracer is not None and (self.cache is not None or reuse)):
+            for i in range(len(self.plan)):
+                if(self._needed[i]):
+                    tracer.cache_status[self.plan.names[i]] = 'miss' if self._executing[i] else 'hit'
+
+        # hash_key -> number of nodes to take the outputs, and a node of the hash. In order of node ids.
+        self._prefetch_refs = {}
+        self._hit_nodes = {}
+        for i in range(len(self.plan)):
+            if(self._needed[i] and not self._executing[i]):
+                self._prefetch_refs[self.plan.hashes[i]] = self._prefetch_refs.get(self.plan.hashes[i], 0) + 1
+                self._hit_nodes.setdefault(self.plan.hashes[i], i)
+
+        # Hits are fetched while nodes run. Hashes requested from cache, number of them not taken yet,
+        # and hashes awaited by nodes before being requested.
+        self._requested = set()
+        self._held = 0
+        self._demanded = deque()
+        self._wake = asyncio.Event()
+        prefetcher = None
+        hits = [h for h in self._prefetch_refs if h not in self._fetches]
+        self._ahead = deque(hits)
+
+        # A hit failing to fetch runs as a miss in this run. Outputs of its scheduled upstream are kept until it is
+        # taken: node_id -> number of hits needing them, hit node_id -> its frontier, node_id -> outputs.
+        # Nodes scheduled late, those of them scheduled only as upstream of failed hits, and hashes failed to fetch.
+        self._fallback_refs = {}
+        self._frontiers = {}
+        self._kept = {}
+        self._late = set()
+        self._fallback_upstream = set()
+        self._failed = set()
+        if(hits):
+            for h in hits:
+                self._fetches[h] = loop.create_future()
+            fetched = set(hits)
+            for i in range(len(self.plan)):
+                if(self._needed[i] and not self._executing[i] and self.plan.hashes[i] in fetched):
+                    self._frontiers[i] = self._frontier(i)
+            prefetcher = asyncio.create_task(self._prefetch_cache())
+
+        try:
+            if(self.scheduler == 'queue'):
+                exc = await self._execute_ready_queue()
+            else:
+                exc = await self._execute_latch()
+        finally:
+            if(prefetcher is not None):
+                prefetcher.cancel()
+            # Also when the run is left early, so no spilled values are left behind
+            self._values = {}
+            self._pending_bytes = 0
+            self._spill.close()
+
+        if(self.cache is not None):
+            await self._flush_cache()
+            if(self._flushes):
+                await asyncio.gather(*self._flushes)
+
+        if(tracer is not None):
+            tracer.record('run', 'executor', start=run_start, nodes=len(self.plan))
 
         self.done = True
         await self.outputs.put(None)
@@ -133,42 +817,201 @@ class Executor:
         if(exc and not self.return_exceptions):
             raise exc
 
-    async def _node_worker(self,
-        node_name: str,
-        node: Node,
-        dataflow: dict[str, list[tuple[str, str]]],  # {"out_node": [("output_field", "input_field")]}
-        upstream_latch: Latch,
-        downstream_latch: list[Latch],
-        hash_key: str):
+    async def _execute_latch(self):
+        self._plan_latch()
+        self._release_downstream = self._count_down
+        self.tasks = []
+        self._remaining = sum(self._needed)
+        self._failure = None
+        self._finished = asyncio.Event()
+
+        if(not self._remaining):
+            return None
+        for i in range(len(self.plan)):
+            if(self._needed[i]):
+                self._spawn_worker(i)
+        await self._finished.wait()
+
+        return self._failure
+
+    def _spawn_worker(self, node_id: int):
+        task = asyncio.create_task(self._node_worker(node_id, self._latches[node_id]))
+        self.tasks.append(task)
+        task.add_done_callback(self._on_worker_done)
+
+    def _on_worker_done(self, task: asyncio.Task):
+        if(task.cancelled() or self._finished.is_set()):
+            return
+
+        if(task.exception() is not None):
+            self._failure = task.exception()
+            self._finished.set()
+
+            return
+
+        self._remaining -= 1
+        if(not self._remaining):
+            self._finished.set()
+
+    async def _execute_ready_queue(self):
+        self._plan_ready_queue()
+        self._release_downstream = self._release_successors
+        self.tasks = set()
+
+        self._spawn_ready()
+        await self._finished.wait()
+
+        if(self._failure is not None):
+            for t in self.tasks:
+                t.cancel()
+
+        return self._failure
+
+    def _push_ready(self, node_id: int):
+        if(self.priority == 'critical_path'):
+            heapq.heappush(self._ready, (-self._ranks[node_id], node_id))
+        else:
+            self._ready.append(node_id)
+
+    def _pop_ready(self):
+        if(self.priority == 'critical_path'):
+            return heapq.heappop(self._ready)[1]
+
+        return self._ready.popleft()
+
+    def _spawn_ready(self):
+        while(self._ready and (self.max_concurrency is None
+            or len(self.tasks) - len(self._stream_tasks) < self.max_concurrency)):
+            node_id = self._pop_ready()
+
+            class_name = self._limited_classes[node_id]
+            if(class_name is not None):
+                if(self._class_running[class_name] >= self.node_concurrency[class_name]):
+                    self._deferred[class_name].append(node_id)
+                    continue
+                self._class_running[class_name] += 1
+
+            self._spawn(node_id, class_name)
+
+    def _spawn(self, node_id: int, class_name: str = None):
+        if(self.tracer is not None):
+            self.tracer.record('wait', 'node', self.plan.names[node_id], self._ready_at[node_id])
+        task = asyncio.create_task(self._run_node(node_id))
+        self.tasks.add(task)
+        self._task_classes[task] = class_name
+        task.add_done_callback(self._on_task_done)
+
+        return task
+
+    async def _release_successors(self, node_id: int, successors: list[int] = None):
+        for s in (self._waiters[node_id] if successors is None else successors):
+            self._in_degrees[s] -= 1
+            if(self._in_degrees[s] == 0):
+                if(self.tracer is not None):
+                    self._ready_at[s] = perf_counter()
+                if(s in self._channels):
+                    # Stream consumers run in the slot of their producer, else it could block on them forever
+                    self._stream_tasks.add(self._spawn(s))
+                else:
+                    self._push_ready(s)
+
+        self._spawn_ready()
+
+    def _on_task_done(self, task: asyncio.Task):
+        self.tasks.discard(task)
+
+        class_name = self._task_classes.pop(task)
+        self._stream_tasks.discard(task)
+        if(class_name is not None):
+            self._class_running[class_name] -= 1
+            if(self._deferred[class_name]):
+                self._push_ready(self._deferred[class_name].popleft())
+
+        if(task.cancelled() or self._finished.is_set()):
+            return
+
+        if(task.exception() is not None):
+            self._failure = task.exception()
+            self._finished.set()
+
+            return
+
+        self._remaining -= 1
+        if(not self._remaining):
+            self._finished.set()
+        else:
+            self._spawn_ready()
+
+    async def _count_down(self, node_id: int, successors: list[int] = None):
+        for s in (self._waiters[node_id] if successors is None else successors):
+            await self._latches[s].count_down()
+
+    async def _node_worker(self, node_id: int, upstream_latch: Latch):
+        start = perf_counter() if self.tracer is not None else None
         try:
             await upstream_latch.wait()
-            outputs = None
-            if(self.cache and hash_key in self.available_cache):
-                try:
-                    # Cache hit
-                    outputs = node.Output.parse_obj(deserialize(await self.cache.get(hash_key)))
-                except BaseException as e:
-                    warn(f"Error getting cache while handling node <{node_name}>，exception {e}", stacklevel=2)
-            
-            if(outputs is None):
-                # Cache miss or fetch failed, execute node
-                outputs = await self._execute_node(node_name, node)
+        except asyncio.exceptions.CancelledError:
+            return
+        if(self.tracer is not None):
+            self.tracer.record('wait', 'node', self.plan.names[node_id], start)
 
-            # Dispatch data to downstream nodes
-            self._dispatch_data(outputs, dataflow)
+        # Stream consumers run in the slot of their producer
+        class_name = type(self.plan.nodes[node_id]).__name__
+        if(self._executing[node_id] and class_name in self._semaphores and node_id not in self._channels):
+            async with self._semaphores[class_name]:
+                await self._run_node(node_id)
+        else:
+            await self._run_node(node_id)
+
+    async def _run_node(self, node_id: int):
+        node_name = self.plan.names[node_id]
+        node = self.plan.nodes[node_id]
+        hash_key = self.plan.hashes[node_id]
+        tracer = self.tracer
+
+        try:
+            cache_hit = not self._executing[node_id]
+            executed = False
+            if(cache_hit):
+                outputs = await self._take_hit(node_id)
+                if(isinstance(outputs, BaseException)):
+                    # Failed to fetch, run it again as a miss
+                    self._fall_back(node_id)
+                    if(self.scheduler == 'queue'):
+                        self._spawn_ready()
 
-            for l in downstream_latch:
-                await l.count_down()
+                    return
+            else:
+                # Cache miss, execute node
+                outputs, executed = await self._execute_shared(node_id, node)
 
-            # Return data
-            await self.outputs.put((node_name, deepcopy(outputs)))
+            if(self.results is not None):
+                self.results[hash_key] = outputs
 
-            # Put cache
-            if(self.cache):
-                try:
-                    await self.cache.put(hash_key, serialize(outputs.model_dump()))
-                except BaseException as e:
-                    warn(f"Error putting cache while handling node <{node_name}>，exception {e}", stacklevel=2)
+            # Dispatch data to downstream nodes
+            start = perf_counter() if tracer is not None else None
+            # Consumers streamed by the node were released when it started
+            streamed = self._streamed.pop(node_id, ())
+            self._dispatch_data(node_id, outputs, streamed)
+            if(node_id in self._fallback_refs or node_id in self._late):
+                self._kept[node_id] = outputs
+            await self._release_downstream(node_id,
+                [s for s in self._waiters[node_id] if s not in streamed] if streamed else None)
+
+            # Return data, but not of nodes scheduled only as upstream of failed hits
+            if(node_id in self._fallback_upstream):
+                pass
+            elif(self.targets is None or self.targets.get(node_id, False) is None):
+                await self.outputs.put((node_name, outputs if self.zero_copy else deepcopy(outputs)))
+            elif(node_id in self.targets):
+                for output_field in self.targets[node_id]:
+                    data = getattr(outputs, output_field)
+                    await self.outputs.put((f'{node_name}.{output_field}', data if self.zero_copy else deepcopy(data)))
+            if(tracer is not None):
+                tracer.record('dispatch', 'node', node_name, start)
+
+            if(self.cache is not None and executed):
+                await self._put_cache(hash_key, outputs)
         except asyncio.exceptions.CancelledError:
             pass
         except TimeoutError as e:
@@ -180,28 +1023,282 @@ class Executor:
                 self.outputs.put_nowait((node_name, e))
             raise RuntimeError(f"Error while handling node <{node_name}>") from e
 
-    async def _execute_node(self, node_name: str, node: Node):
-        # Parse data
-        data = node.Input.parse_obj(self.input_data.pop(node_name))
+    def _get_backend(self, node: Node):
+        backend = node.backend or self.backend
+        if(isinstance(backend, Backend)):
+            return backend
 
-        # Execute the node
-        node.check_inputs(data)
+        if(backend not in self.backends):
+            self.backends[backend] = BACKENDS[backend](self.max_workers)
+            self._owned_backends.append(self.backends[backend])
+
+        return self.backends[backend]
+
+    async def _execute_shared(self, node_id: int, node: Node):
+        # Execute the node, or wait for the same hash in flight. Returns outputs and whether this node executed.
+        # Streaming nodes are not shared, as chunks go to consumers of this run.
+        if(self.single_flight is None or node.streaming() or self._stream_sources[node_id] is not None):
+            return await self._execute_node(node_id, node), True
+
+        hash_key = self.plan.hashes[node_id]
+        while(True):
+            future = self.single_flight.join(hash_key)
+            if(future is None):
+                break
+
+            start = perf_counter() if self.tracer is not None else None
+            try:
+                outputs = await asyncio.shield(future)
+            except FlightAbandoned:
+                # Compute it here instead
+                continue
+
+            self._drop_inputs(node_id)
+            if(self.tracer is not None):
+                self.tracer.record('shared', 'node', self.plan.names[node_id], start)
+
+            return outputs, False
+
+        future = self.single_flight.begin(hash_key)
         try:
-            outputs = await asyncio.wait_for(node.execute(data), self.timeout)
+            outputs = await self._execute_node(node_id, node)
         except BaseException as e:
+            self.single_flight.end(hash_key, future, exception=e)
             raise
-        node.check_outputs(outputs)
+        self.single_flight.end(hash_key, future, outputs)
+
+        return outputs, True
+
+    async def _execute_node(self, node_id: int, node: Node):
+        tracer = self.tracer
+        node_name = self.plan.names[node_id]
+
+        # Collect data from upstream
+        start = perf_counter() if tracer is not None else None
+        values = self.input_data[node_id]
+        self.input_data[node_id] = None
+        # Fields of the streaming upstream node come from the channel if it executed, else as one chunk
+        channel = self._channels.pop(node_id, None)
+        source = self._stream_sources[node_id] if channel is not None else None
+        for input_field, out_node, output_field in self.plan.inflow[node_id]:
+            if(out_node != source):
+                values[input_field] = self._take_value((out_node, output_field), node)
+        if(tracer is not None):
+            tracer.record('collect', 'node', node_name, start)
+            start = perf_counter()
+
+        # Parse data
+        if(node.stream_inputs):
+            data = self._input_chunks(node_id, node, values, channel)
+        else:
+            data = self._input_builders[node_id](values)
+            if(not self.trusted):
+                node.check_inputs(data)
+        del values
+        if(tracer is not None):
+            tracer.record('validate', 'node', node_name, start)
+            start = perf_counter()
+
+        # Wait for the node budget shared with other executors, stream consumers run in the slot of their producer
+        limiter = self.node_limiter if channel is None else None
+        if(limiter is not None):
+            await limiter.acquire()
+            if(tracer is not None):
+                tracer.record('wait', 'node', node_name, start)
+                start = perf_counter()
+
+        # Execute the node
+        if(self.runtimes is not None):
+            start = perf_counter()
+        try:
+            backend = self._get_backend(node)
+            if(node.streaming() or node.stream_inputs):
+                # Chunks are passed on the event loop
+                execution = self._execute_stream(node_id, node, data)
+            elif(self.batcher is not None and node.batchable()):
+                execution = self.batcher.submit(node, data, backend)
+            elif(backend.takes_hash):
+                execution = backend.run(node, data, hash_key=self.plan.hashes[node_id])
+            else:
+                execution = backend.run(node, data)
+            outputs = await asyncio.wait_for(execution, self.timeout)
+        finally:
+            if(limiter is not None):
+                limiter.release()
+            if(channel is not None):
+                channel.close()
+        if(self.runtimes is not None):
+            self.runtimes.record(type(node).__name__, perf_counter() - start)
+        if(tracer is not None):
+            tracer.record('execute', 'node', node_name, start)
+            start = perf_counter()
+
+        # Chunks of streaming nodes are checked one by one
+        if(not node.streaming()):
+            node.check_outputs(outputs)
+        if(tracer is not None):
+            tracer.record('validate', 'node', node_name, start)
 
         return outputs
 
-    def _dispatch_data(self,
-        node_outputs: Data,
-        dataflow: dict[str, list[tuple[str, str]]]):
-        for output_field, data_flow in dataflow.items():
+    async def _input_chunks(self, node_id: int, node: Node, values: dict, channel: Channel):
+        # Inputs of a node with `Node.stream_inputs`, one per chunk received from the channel
+        build = self._input_builders[node_id]
+        if(channel is not None):
+            source = self._stream_sources[node_id]
+            fields = [(input_field, output_field)
+                for input_field, out_node, output_field in self.plan.inflow[node_id] if out_node == source]
+            copy = not self.zero_copy or node.mutates_inputs
+            async for chunk in channel:
+                for input_field, output_field in fields:
+                    value = getattr(chunk, output_field)
+                    values[input_field] = deepcopy(value) if copy else value
+                data = build(values)
+                if(not self.trusted):
+                    node.check_inputs(data)
+                yield data
+
+            return
+
+        data = build(values)
+        if(not self.trusted):
+            node.check_inputs(data)
+        yield data
+
+    async def _execute_stream(self, node_id: int, node: Node, data):
+        if(not node.streaming()):
+            return await node.execute(data)
+
+        # Consumers are released to run along with the node, others wait for the merged outputs
+        # Nodes scheduled late take whole outputs, their upstream is not admitted along with them
+        consumers = [s for s in self._waiters[node_id] if self._stream_sources[s] == node_id and s not in self._late]
+        channels = [Channel(self.channel_size) for _ in consumers]
+        self._channels.update(zip(consumers, channels))
+        self._streamed[node_id] = consumers
+        await self._release_downstream(node_id, consumers)
+
+        chunks = [] if self._needs_outputs(node_id, consumers) else None
+        async for chunk in node.execute(data):
+            node.check_outputs(chunk)
+            for channel in channels:
+                await channel.put(chunk)
+            if(chunks is not None):
+                chunks.append(chunk)
+        for channel in channels:
+            await channel.end()
+
+        return node.merge_chunks(chunks) if chunks is not None else None
+
+    def _needs_outputs(self, node_id: int, streamed: list[int]):
+        # Whether whole outputs of a streaming node are consumed, or only its chunks
+        if(self.cache is not None or self.results is not None):
+            return True
+        if(self.targets is None or node_id in self.targets):
+            return True
+
+        return any(self._executing[s] and s not in streamed
+            for _, data_flow in self.plan.dataflow[node_id] for s, _ in data_flow)
+
+    def _dispatch_data(self, node_id: int, node_outputs: Data, streamed: list[int] = ()):
+        # ((output_field, ((in_node_id, input_field), ...)), ...)
+        for output_field, data_flow in self.plan.dataflow[node_id]:
+            # Nodes fetched from cache or skipped take no inputs
+            consumers = sum(1 for output_node, _ in data_flow
+                if self._executing[output_node] and output_node not in streamed)
+            if(not consumers):
+                continue
+
             data = getattr(node_outputs, output_field)
+            size = sizeof(data) if self.memory_budget is not None else 0
+            self._values[(node_id, output_field)] = [data, consumers, size, None]
+            self._pending_bytes += size
 
-            for output_node, input_field in data_flow:
-                self.input_data[output_node][input_field] = deepcopy(data)
+            if(self.memory_budget is not None and self._pending_bytes > self.memory_budget):
+                self._spill_values()
+
+    def _spill_values(self):
+        # Spill the largest values in memory until pending values fit in the budget
+        candidates = sorted((entry for entry in self._values.values()
+                if entry[3] is None and entry[2] >= self.spill_threshold),
+            key=lambda entry: entry[2], reverse=True)
+
+        for entry in candidates:
+            if(self._pending_bytes <= self.memory_budget):
+                break
+
+            try:
+                entry[3] = self._spill.put(entry[0])
+            except Exception as e:
+                # Not serializable, keep it in memory
+                warn(f"Error spilling value of {type(entry[0])}，exception {e}", stacklevel=2)
+                continue
+
+            entry[0] = None
+            self._pending_bytes -= entry[2]
+
+    def _release_value(self, key: tuple[int, str]):
+        entry = self._values[key]
+        entry[1] -= 1
+        if(not entry[1]):
+            # Released by the last consumer
+            del self._values[key]
+            if(entry[3] is None):
+                self._pending_bytes -= entry[2]
+
+        return entry
+
+    def _drop_inputs(self, node_id: int):
+        # Release inputs of a node not executed
+        self.input_data[node_id] = None
+        for _, out_node, output_field in self.plan.inflow[node_id]:
+            entry = self._release_value((out_node, output_field))
+            if(entry[3] is not None and not entry[1]):
+                self._spill.remove(entry[3])
+
+    def _take_value(self, key: tuple[int, str], node: Node):
+        entry = self._release_value(key)
+
+        if(entry[3] is not None):
+            # Spilled values are loaded as fresh objects for every consumer
+            value = self._spill.get(entry[3])
+            if(not entry[1]):
+                self._spill.remove(entry[3])
+
+            return value
+
+        if(self.zero_copy and not node.mutates_inputs):
+            return entry[0]
+
+        return deepcopy(entry[0])
+
+
+# (Input class, trusted) -> function building inputs from a dict of values
+_INPUT_BUILDERS = {}
+
+
+def _input_builder(input_class: type, trusted: bool):
+    key = (input_class, trusted)
+    if(key not in _INPUT_BUILDERS):
+        if(trusted):
+            construct = input_class.model_construct
+            _INPUT_BUILDERS[key] = lambda values: construct(**values)
+        else:
+            # Same as `model_validate`, without the lookup per call
+            _INPUT_BUILDERS[key] = input_class.__pydantic_validator__.validate_python
+
+    return _INPUT_BUILDERS[key]
+
+
+def _serialize_outputs(batch: list[tuple[str, Data]]):
+    items = []
+    failures = []
+    for hash_key, outputs in batch:
+        try:
+            items.append((hash_key, serialize(outputs.model_dump())))
+        except Exception as e:
+            failures.append((hash_key, e))
+
+    return items, failures
 
 
 def execute(*args, **kwargs):
@@ -210,3 +1307,12 @@ def execute(*args, **kwargs):
             return {node_name: node_output async for (node_name, node_output) in exe}
 
     return asyncio.run(execute_wrapper())
+
+
+def execute_map(*args, **kwargs):
+    # Results of `Executor.map` in order of the input sets
+    async def execute_map_wrapper():
+        results = {index: outputs async for (index, outputs) in Executor.map(*args, **kwargs)}
+        return [results[i] for i in range(len(results))]
+
+    return asyncio.run(execute_map_wrapper())
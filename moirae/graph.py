@@ -6,7 +6,8 @@ import networkx as nx
 from pydantic import ValidationError
 
 from moirae.node import Node, NODES
-from moirae.hash import stable_hash
+from moirae.hash import stable_hash, input_hash, merkle_hash
+from moirae.plan import Plan
 
 
 _VAR_NAME_RE = r"[a-zA-Z_]\w*"
@@ -14,8 +15,30 @@ _VAR_NAME_RE = r"[a-zA-Z_]\w*"
 _REF_RE = re.compile(r"\$\{(" + _VAR_NAME_RE + r").(" + _VAR_NAME_RE + r")\}")
 
 
+def _edge_key(edge):
+    # Edge data dicts are not comparable, which breaks sorting parallel edges between two nodes.
+    out_node, in_node, edge_data = edge
+    return out_node, in_node, sorted(edge_data.items())
+
+
+def _is_ref(data):
+    return type(data) == str and _REF_RE.match(data) is not None
+
+
+def _fingerprint(node_attrs: dict):
+    # Hash of the class, arguments and inputs of a node definition, and `input_hash` of its literal inputs
+    # reused by the Merkle hash, so literals are hashed once. None if they are not hashable.
+    try:
+        inputs = node_attrs['inputs']
+        inputs_hash = input_hash({f: None if _is_ref(data) else data for f, data in inputs.items()})
+        refs = sorted((f, data) for f, data in inputs.items() if _is_ref(data))
+        return stable_hash(node_attrs['node'], sorted(node_attrs['arguments'].items()), inputs_hash, refs), inputs_hash
+    except Exception:
+        return None, None
+
+
 class Graph:
-    def __init__(self, graph):
+    def __init__(self, graph, previous: 'Graph' = None):
         self.graph = nx.MultiDiGraph()
         self.input_data = {}
 
@@ -23,15 +46,57 @@ class Graph:
         self.args_schema = {}
         self.outputs_schema = {}
 
+        # Fingerprint of the definition of each node, to diff against changed definitions, and hash of its literal inputs
+        self.fingerprints = {}
+        self._inputs_hashes = {}
+        for node_name, node_attrs in graph.items():
+            self.fingerprints[node_name], self._inputs_hashes[node_name] = _fingerprint(node_attrs)
+        # Nodes added or changed from the previous graph, None for all nodes
+        self.changed = previous._diff_fingerprints(self.fingerprints) if previous is not None else None
+
         # Build graph
-        self._add_nodes(graph)
-        self._add_edges(graph)
+        self._add_nodes(graph, previous)
+        self._add_edges(graph, previous)
 
         assert nx.is_directed_acyclic_graph(self.graph), 'The given graph is not a DAG.'
 
-        self._topological_hash()
+        self._topological_hash(previous)
+
+        self._plan = None
+
+    def diff(self, graph):
+        # Names of nodes added or changed in the definition `graph`, removed nodes are not included.
+        return self._diff_fingerprints({node_name: _fingerprint(node_attrs)[0] for node_name, node_attrs in graph.items()})
+
+    def _diff_fingerprints(self, fingerprints: dict):
+        # Definitions not hashable are always changed
+        return {node_name for node_name, f in fingerprints.items() if f is None or self.fingerprints.get(node_name) != f}
+
+    def update(self, graph):
+        """Build the graph of a changed definition. Nodes and hashes of nodes unchanged and not downstream
+        of a change are reused, so only the affected cone is rehashed. Run it with `Executor(reuse=...)`
+        to reuse outputs of the previous run for unaffected nodes."""
+        return Graph(graph, previous=self)
+
+    def affected(self):
+        # Names of changed nodes and their descendants, None for all nodes
+        if(self.changed is None):
+            return None
+
+        affected = set(self.changed)
+        for n in self.changed:
+            affected.update(nx.descendants(self.graph, n))
+
+        return affected
 
-    def _add_nodes(self, graph):
+    def compile(self):
+        # Compile the graph to an immutable plan once, shared by all executors.
+        if(self._plan is None):
+            self._plan = Plan.compile(self)
+
+        return self._plan
+
+    def _add_nodes(self, graph, previous: 'Graph' = None):
         for node_name, node_attrs in graph.items():
             if(re.match(_VAR_NAME_RE, node_name) is None):
                 raise NameError(f"node_name {node_name} is invaild. It should consistent with naming rules of python variable.")
@@ -41,8 +106,15 @@ class Graph:
 
             node_class = NODES[node_attrs['node']]
 
+            # Nodes are immutable in graphs, reuse the previous instance with its memoized hash
+            if(previous is not None and node_name not in self.changed):
+                self.input_data[node_name] = {}
+                self.outputs_schema[node_name] = node_class.Output
+                self.graph.add_node(node_name, node=previous.graph.nodes[node_name]['node'])
+                continue
+
             try:
-                node = node_class.parse_obj(node_attrs['arguments'])
+                node = node_class.model_validate(node_attrs['arguments'])
             except ValidationError as e:
                 raise ValidationError(f"Cannot initialize node {node_name}. The node arguments are invaild.") from e
             except Exception as e:
@@ -57,9 +129,11 @@ class Graph:
             self.outputs_schema[node_name] = node_class.Output
             self.graph.add_node(node_name, node=node)
 
-    def _add_edges(self, graph):
+    def _add_edges(self, graph, previous: 'Graph' = None):
         for node_name, node_attrs in graph.items():
             this_node = self.graph.nodes[node_name]['node']
+            # Literal inputs of unchanged nodes are shared with the previous graph
+            reused = previous is not None and node_name not in self.changed
 
             # Check if the input matches the input defination
             if(set(node_attrs['inputs'].keys()) != this_node.input_fields.keys()):
@@ -79,7 +153,7 @@ class Graph:
                     if(node_name not in self.inputs_schema):
                         self.inputs_schema[node_name] = {}
 
-                    self.inputs_schema[node_name][input_field] = this_node.Input.__fields__[input_field]
+                    self.inputs_schema[node_name][input_field] = this_node.Input.model_fields[input_field]
 
                     continue
                 """
@@ -89,9 +163,9 @@ class Graph:
                     edge = _REF_RE.match(data)
 
                     out_node, output_field = edge.groups()
-                    out_node_class = self.graph.nodes[out_node]['node']
                     if(out_node not in self.graph.nodes):
                         raise ValueError(f"No <node id={out_node}> referenced by <node id={node_name}>.")
+                    out_node_class = self.graph.nodes[out_node]['node']
 
                     if(output_field not in out_node_class.output_fields):
                         raise NameError(f"""Not existed field {output_field} in {out_node_class.Output} referenced by <node id={node_name}>.
@@ -107,42 +181,31 @@ class Graph:
                     continue
 
                 # Handle value
-                self.input_data[node_name][input_field] = deepcopy(data)
+                if(reused):
+                    self.input_data[node_name][input_field] = previous.input_data[node_name][input_field]
+                else:
+                    self.input_data[node_name][input_field] = deepcopy(data)
 
                 if(node_name not in self.args_schema):
                     self.args_schema[node_name] = {}
-                self.args_schema[node_name][input_field] = this_node.Input.__fields__[input_field]
-
-    def _topological_hash(self):
-        in_degrees = self.graph.in_degree()
-
-        # Handle leaf nodes
-        leaf_nodes = [n for n in self.graph.nodes() if self.graph.in_degree(n) == 0]
-        for n in leaf_nodes:
-            this_node = self.graph.nodes[n]
-
-            # Hash of Leaf Nodes: hash(hash(Node); hash(Input))
-            this_node['hash'] = stable_hash(this_node['node'].hash,
-                stable_hash(sorted(self.input_data[n].items(), key=lambda x: x[0])))
-
-        # Handle other nodes
-        for n in nx.topological_sort(self.graph):  # nx.topological_sort will discard isolated nodes
-            this_node = self.graph.nodes[n]
-
-            if(in_degrees[n] == 0):
-                # Discard Leaf Nodes
-                continue
-            elif(in_degrees[n] == len(this_node['node'].input_fields)):
-                # Hash Nodes without ouside inputs: hash(hash(Node); hash(ParentNodes, InEdges))
-                this_node['hash'] = stable_hash(
-                        this_node['node'].hash,
-                        [(self.graph.nodes(data=True)[out_n]['hash'],
-                            stable_hash(sorted(edge_data.items()))) for out_n, in_n, edge_data in sorted(self.graph.in_edges(data=True)) if in_n == n])
-            else:
-                # Hash Nodes with ouside inputs: hash(hash(Node); hash(Input); hash(ParentNodes, InEdges))
-                this_node['hash'] = stable_hash(
-                        this_node['node'].hash,
-                        [(self.graph.nodes(data=True)[out_n]['hash'],
-                            stable_hash(sorted(edge_data.items()))) for out_n, in_n, edge_data in sorted(self.graph.in_edges(data=True)) if in_n == n],
-                        stable_hash(sorted(self.input_data[n].items(), key=lambda x: x[0])))
+                self.args_schema[node_name][input_field] = this_node.Input.model_fields[input_field]
+
+    def _topological_hash(self, previous: 'Graph' = None):
+        # Parents are always hashed before their children in topological order,
+        # so each node only looks at its own in-edges and the cached hashes of its parents: O(N + E).
+        nodes = self.graph.nodes
+        affected = set()
+        for n in nx.topological_sort(self.graph):
+            this_node = nodes[n]
+            if(previous is not None):
+                # Unchanged nodes with unchanged parents keep their hash
+                if(n not in self.changed and not any(p in affected for p in self.graph.predecessors(n))):
+                    this_node['hash'] = previous.graph.nodes[n]['hash']
+                    continue
+                affected.add(n)
 
+            in_edges = sorted(self.graph.in_edges(n, data=True), key=_edge_key)
+            parents = [(nodes[out_n]['hash'], edge_data['output_field'], edge_data['input_field'])
+                for out_n, _, edge_data in in_edges]
+            this_node['hash'] = merkle_hash(this_node['node'].hash, self.input_data[n], parents,
+                len(this_node['node'].input_fields), self._inputs_hashes[n])
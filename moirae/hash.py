@@ -1,8 +1,138 @@
 import hashlib
-import pickle
-from moirae.serialize import serialize
+
+import msgpack
+
+
+# Ext type code of buffer-protocol objects (e.g. NumPy arrays): packed [format, shape] followed by raw bytes.
+_BUFFER_EXT = 0x42
+_SCALARS = (type(None), bool, int, float, str)
+# Containers longer than this are packed at once by msgpack instead of walked.
+_WALK_LENGTH = 32
+
+
+def _buffer_header(buffer: memoryview):
+    return msgpack.packb([buffer.format, list(buffer.shape)])
+
+
+def _pack_default(obj):
+    # Fallback of msgpack for buffer-protocol objects inside packed containers
+    try:
+        buffer = memoryview(obj)
+    except TypeError:
+        raise TypeError(f"Cannot hash object of type {type(obj)}.") from None
+
+    return msgpack.ExtType(_BUFFER_EXT, _buffer_header(buffer) + buffer.tobytes())
+
+
+def _bin_header(size: int):
+    if(size < 2 ** 8):
+        return b'\xc4' + size.to_bytes(1, 'big')
+    elif(size < 2 ** 16):
+        return b'\xc5' + size.to_bytes(2, 'big')
+    elif(size < 2 ** 32):
+        return b'\xc6' + size.to_bytes(4, 'big')
+
+    # Beyond msgpack, only needs to be unambiguous for hashing
+    return b'\xc6\xff\xff\xff\xff' + size.to_bytes(8, 'big')
+
+
+def _ext_header(size: int, code: int):
+    fixext = {1: b'\xd4', 2: b'\xd5', 4: b'\xd6', 8: b'\xd7', 16: b'\xd8'}
+    if(size in fixext):
+        return fixext[size] + bytes([code])
+    elif(size < 2 ** 8):
+        return b'\xc7' + size.to_bytes(1, 'big') + bytes([code])
+    elif(size < 2 ** 16):
+        return b'\xc8' + size.to_bytes(2, 'big') + bytes([code])
+    elif(size < 2 ** 32):
+        return b'\xc9' + size.to_bytes(4, 'big') + bytes([code])
+
+    return b'\xc9\xff\xff\xff\xff' + size.to_bytes(8, 'big') + bytes([code])
+
+
+def _flat(buffer: memoryview):
+    if(not buffer.c_contiguous):
+        buffer = memoryview(buffer.tobytes())
+
+    return buffer if buffer.ndim == 1 and buffer.format == 'B' else buffer.cast('B')
+
+
+class _HashEncoder:
+    """Streams msgpack of an object into an incremental blake2b, without compression.
+    The stream is the same as `msgpack.packb` except buffer-protocol objects, which are packed as an ext type.
+    Short containers are walked, so large bytes and buffers inside them are hashed without copying."""
+    def __init__(self):
+        self.hash_obj = hashlib.blake2b()
+        self.packer = msgpack.Packer(default=_pack_default)
+
+    def update(self, obj):
+        if(type(obj) in _SCALARS):
+            self.hash_obj.update(self.packer.pack(obj))
+        elif(isinstance(obj, (list, tuple))):
+            if(len(obj) > _WALK_LENGTH):
+                self.hash_obj.update(self.packer.pack(obj))
+            else:
+                self.hash_obj.update(self.packer.pack_array_header(len(obj)))
+                for v in obj:
+                    self.update(v)
+        elif(isinstance(obj, dict)):
+            if(len(obj) > _WALK_LENGTH):
+                self.hash_obj.update(self.packer.pack(obj))
+            else:
+                self.hash_obj.update(self.packer.pack_map_header(len(obj)))
+                for k, v in obj.items():
+                    self.update(k)
+                    self.update(v)
+        elif(isinstance(obj, (bytes, bytearray, memoryview))):
+            buffer = _flat(memoryview(obj))
+            self.hash_obj.update(_bin_header(buffer.nbytes))
+            self.hash_obj.update(buffer)
+        elif(isinstance(obj, _SCALARS)):
+            # Subclasses of scalars, e.g. enums
+            self.hash_obj.update(self.packer.pack(obj))
+        else:
+            try:
+                buffer = memoryview(obj)
+            except TypeError:
+                raise TypeError(f"Cannot hash object of type {type(obj)}.") from None
+
+            header = _buffer_header(buffer)
+            buffer = _flat(buffer)
+            self.hash_obj.update(_ext_header(len(header) + buffer.nbytes, _BUFFER_EXT))
+            self.hash_obj.update(header)
+            self.hash_obj.update(buffer)
+
+    def hexdigest(self):
+        return self.hash_obj.hexdigest()
 
 
 def stable_hash(*args, **kwargs):
-    hash_obj = hashlib.blake2b(serialize(args))
-    return hash_obj.hexdigest()
+    encoder = _HashEncoder()
+    encoder.update(args)
+
+    return encoder.hexdigest()
+
+
+def input_hash(input_data: dict):
+    # Fields fed by edges are reserved as None
+    return stable_hash(sorted(input_data.items(), key=lambda x: x[0]))
+
+
+def merkle_hash(node_hash: str, input_data: dict, parents: list, num_input_fields: int, inputs_hash: str = None):
+    # Topological hash of a node. `parents` are (parent hash, output_field, input_field) of its in-edges,
+    # sorted by (parent node name, input_field, output_field). `inputs_hash` is `input_hash(input_data)` if known.
+    if(inputs_hash is None and (not parents or len(parents) != num_input_fields)):
+        inputs_hash = input_hash(input_data)
+
+    if(not parents):
+        # Hash of Leaf Nodes: hash(hash(Node); hash(Input))
+        return stable_hash(node_hash, inputs_hash)
+
+    parents = [(h, stable_hash([('input_field', input_field), ('output_field', output_field)]))
+        for h, output_field, input_field in parents]
+    if(len(parents) == num_input_fields):
+        # Hash Nodes without ouside inputs: hash(hash(Node); hash(ParentNodes, InEdges))
+        return stable_hash(node_hash, parents)
+
+    # Hash Nodes with ouside inputs: hash(hash(Node); hash(Input); hash(ParentNodes, InEdges))
+    return stable_hash(node_hash, parents, inputs_hash)
@@ -1,18 +1,40 @@
 from abc import ABC, abstractmethod
+from itertools import chain
 import hashlib
 import inspect
 import asyncio
+from typing import ClassVar, Optional
 
-from pydantic import BaseModel
+from pydantic import BaseModel, PrivateAttr
 
 from moirae import Data
 from moirae.hash import stable_hash
+from moirae.backend import BACKENDS
 
 
 NODES = {}
 
 
 class Node(BaseModel, ABC):
+    # Name of the execution backend of this node class: "async", "thread" or "process".
+    # `None` means following the backend of the executor.
+    backend: ClassVar[Optional[str]] = None
+    # Whether `execute` mutates its inputs in place. In zero-copy mode of the executor,
+    # only nodes declaring this receive copies of upstream outputs.
+    mutates_inputs: ClassVar[bool] = False
+    # Maximum number of nodes of this class executing at once in an executor, `None` means unlimited.
+    max_concurrency: ClassVar[Optional[int]] = None
+    # Nodes can define `execute_batch(self, inputs: list[Input]) -> list[Output]` (sync or async), equivalent to
+    # `execute` on each input, to process inputs of many runs in one call when executors share a `moirae.Batcher`.
+    # Maximum number of inputs per `execute_batch` call, `None` means following the batcher.
+    max_batch_size: ClassVar[Optional[int]] = None
+    # Nodes can define `execute` as an async generator yielding `Output` chunks. Whole outputs are merged from
+    # the chunks by `merge_chunks`.
+    # Whether `execute` receives an async iterator of `Input` chunks, one per chunk of a streaming upstream node.
+    stream_inputs: ClassVar[bool] = False
+
+    # Memoized `hash`, reset when arguments are re-assigned
+    _hash: Optional[str] = PrivateAttr(default=None)
 
     @classmethod
     def __init_subclass__(cls, *args, **kwargs):
@@ -33,16 +55,59 @@ class Node(BaseModel, ABC):
         if(not issubclass(cls.__dict__['Output'], Data)):
             raise TypeError(f"Output of the node {cls} must be a concflow.Data!")
 
+        if(cls.backend is not None and cls.backend not in BACKENDS):
+            raise ValueError(f"Unknown backend {cls.backend} of the node {cls}. Available backends are {list(BACKENDS)}.")
+        if(cls.max_concurrency is not None and cls.max_concurrency < 1):
+            raise ValueError(f"max_concurrency of the node {cls} should be >= 1")
+        if(cls.max_batch_size is not None and cls.max_batch_size < 1):
+            raise ValueError(f"max_batch_size of the node {cls} should be >= 1")
+        if((cls.streaming() or cls.stream_inputs) and cls.backend not in (None, 'async')):
+            raise ValueError(f"Streaming node {cls} runs on the event loop, its backend must be async.")
+
         cls._signature = cls._get_signature()
 
     @classmethod
     def _get_signature(cls):
-        return stable_hash(
+        signature = [
             cls.__class__.__name__,
-            sorted(list(cls.__fields__.keys())),
-            sorted(list(cls.Input.__fields__.keys())),
-            sorted(list(cls.Output.__fields__.keys())),
-            inspect.getsource(cls.execute))
+            sorted(list(cls.model_fields.keys())),
+            sorted(list(cls.Input.model_fields.keys())),
+            sorted(list(cls.Output.model_fields.keys())),
+            inspect.getsource(cls.execute)]
+        if(cls.batchable()):
+            signature.append(inspect.getsource(cls.execute_batch))
+
+        return stable_hash(*signature)
+
+    @classmethod
+    def batchable(cls):
+        return callable(getattr(cls, 'execute_batch', None))
+
+    @classmethod
+    def streaming(cls):
+        return inspect.isasyncgenfunction(cls.execute)
+
+    @classmethod
+    def merge_chunks(cls, chunks: list):
+        # Whole outputs of a streaming node: lists, tuples, strings and bytes of chunks are concatenated,
+        # dicts are merged, and other fields take the last chunk.
+        if(not chunks):
+            return cls.Output()
+
+        values = {}
+        for field in cls.Output.model_fields:
+            parts = [getattr(c, field) for c in chunks]
+            if(isinstance(parts[0], (list, tuple))):
+                values[field] = type(parts[0])(chain.from_iterable(parts))
+            elif(isinstance(parts[0], (str, bytes))):
+                values[field] = parts[0][:0].join(parts)
+            elif(isinstance(parts[0], dict)):
+                values[field] = {k: v for p in parts for k, v in p.items()}
+            else:
+                values[field] = parts[-1]
+
+        # Chunks are validated outputs already
+        return cls.Output.model_construct(**values)
 
     @abstractmethod
     async def execute(self, inputs):
@@ -58,22 +123,58 @@ class Node(BaseModel, ABC):
 
     def __call__(self, inputs):
         self.check_inputs(inputs)
-        outputs = asyncio.run(self.execute(inputs))
+        if(self.stream_inputs or self.streaming()):
+            return asyncio.run(_run_streaming(self, inputs))
+
+        outputs = self.execute(inputs)
+        if(inspect.isawaitable(outputs)):
+            outputs = asyncio.run(outputs)
         self.check_outputs(outputs)
 
         return outputs
 
+    def __setattr__(self, name, value):
+        super().__setattr__(name, value)
+        if(name in self.__class__.model_fields):
+            self._hash = None
+
     @property
     def hash(self):
-        return stable_hash(
+        if(self._hash is None):
+            self._hash = stable_hash(
                 self._signature,
                 sorted(self.__dict__.items(), key=lambda x: x[0]))
 
+        return self._hash
+
     @property
     def input_fields(self):
-        return self.Input.__fields__
+        return self.Input.model_fields
 
     @property
     def output_fields(self):
-        return self.Output.__fields__
+        return self.Output.model_fields
+
+
+
+async def _iterate(items):
+    for item in items:
+        yield item
+
+
+async def _run_streaming(node: Node, inputs):
+    # Eager execution of a streaming node on one input, return its whole outputs
+    if(node.stream_inputs):
+        inputs = _iterate((inputs, ))
+    if(not node.streaming()):
+        outputs = await node.execute(inputs)
+        node.check_outputs(outputs)
+
+        return outputs
+
+    chunks = []
+    async for chunk in node.execute(inputs):
+        node.check_outputs(chunk)
+        chunks.append(chunk)
 
+    return node.merge_chunks(chunks)
@@ -0,0 +1,103 @@
+from dataclasses import dataclass, replace
+from types import MappingProxyType
+from typing import Mapping
+
+import networkx as nx
+
+from moirae.node import Node
+from moirae.hash import merkle_hash
+
+
+@dataclass(frozen=True, eq=False)
+class Plan:
+    """Immutable, index-based execution plan compiled from a `moirae.Graph`.
+    Nodes are referred by integer ids, which are positions in a topological order.
+    A plan is shared by all executors of the same graph, so it must not be mutated."""
+    # Node name of each node id
+    names: tuple[str, ...]
+    # Node name -> node id
+    index: Mapping[str, int]
+    # Node instance of each node id
+    nodes: tuple[Node, ...]
+    # Topological hash of each node id
+    hashes: tuple[str, ...]
+    # Distinct predcessor ids of each node id
+    predecessors: tuple[tuple[int, ...], ...]
+    # Distinct successor ids of each node id
+    successors: tuple[tuple[int, ...], ...]
+    # ((output_field, ((in_node_id, input_field), ...)), ...) of each node id
+    dataflow: tuple[tuple[tuple[str, tuple[tuple[int, str], ...]], ...], ...]
+    # ((input_field, out_node_id, output_field), ...) of each node id
+    inflow: tuple[tuple[tuple[str, int, str], ...], ...]
+    # Literal inputs of each node id, fields fed by edges are reserved as None.
+    # Values are shared by all runs, do not mutate them.
+    input_data: tuple[Mapping[str, object], ...]
+
+    def __len__(self):
+        return len(self.names)
+
+    def with_inputs(self, overrides: Mapping[str, Mapping[str, object]]):
+        """Derive a plan of the same graph with literal inputs overridden as `{node_name: {input_field: value}}`.
+        Everything else is shared, only hashes of the overridden nodes and their descendants are recomputed."""
+        input_data = list(self.input_data)
+        changed = [False] * len(self)
+        for node_name, inputs in overrides.items():
+            if(node_name not in self.index):
+                raise ValueError(f"No <node id={node_name}> to override inputs.")
+
+            node_id = self.index[node_name]
+            edge_fields = {input_field for input_field, _, _ in self.inflow[node_id]}
+            data = dict(input_data[node_id])
+            for input_field, value in inputs.items():
+                if(input_field not in data):
+                    raise NameError(f"Not existed field {input_field} in {self.nodes[node_id].Input} of <node id={node_name}>.")
+                if(input_field in edge_fields):
+                    raise ValueError(f"Input {input_field} of <node id={node_name}> is fed by an edge, it cannot be overridden.")
+                data[input_field] = value
+
+            input_data[node_id] = MappingProxyType(data)
+            changed[node_id] = True
+
+        hashes = list(self.hashes)
+        for i in range(len(self)):
+            if(not changed[i] and not any(changed[p] for p in self.predecessors[i])):
+                continue
+
+            changed[i] = True
+            # Same order as the in-edges hashed by `Graph`
+            parents = sorted((self.names[out_id], input_field, output_field, hashes[out_id])
+                for input_field, out_id, output_field in self.inflow[i])
+            hashes[i] = merkle_hash(self.nodes[i].hash, input_data[i],
+                [(h, output_field, input_field) for _, input_field, output_field, h in parents],
+                len(self.nodes[i].input_fields))
+
+        return replace(self, hashes=tuple(hashes), input_data=tuple(input_data))
+
+    @classmethod
+    def compile(cls, graph):
+        names = tuple(nx.topological_sort(graph.graph))
+        index = {n: i for i, n in enumerate(names)}
+
+        predecessors = [set() for _ in names]
+        successors = [set() for _ in names]
+        dataflows = [{} for _ in names]
+        inflows = [[] for _ in names]
+        for out_node, in_node, edge in graph.graph.edges(data=True):
+            out_id, in_id = index[out_node], index[in_node]
+            predecessors[in_id].add(out_id)
+            successors[out_id].add(in_id)
+            dataflows[out_id].setdefault(edge['output_field'], []).append((in_id, edge['input_field']))
+            inflows[in_id].append((edge['input_field'], out_id, edge['output_field']))
+
+        node_data = graph.graph.nodes
+        return cls(
+            names=names,
+            index=MappingProxyType(index),
+            nodes=tuple(node_data[n]['node'] for n in names),
+            hashes=tuple(node_data[n]['hash'] for n in names),
+            predecessors=tuple(tuple(sorted(p)) for p in predecessors),
+            successors=tuple(tuple(sorted(s)) for s in successors),
+            dataflow=tuple(tuple((output_field, tuple(targets)) for output_field, targets in d.items())
+                for d in dataflows),
+            inflow=tuple(tuple(sorted(i)) for i in inflows),
+            input_data=tuple(MappingProxyType(dict(graph.input_data[n])) for n in names))
@@ -0,0 +1,37 @@
+from typing import Sequence
+
+
+class RuntimeStats:
+    """Runtime estimates of `execute` per Node class, recorded by executors as exponential moving averages.
+    Share an instance between executors, or persist `to_dict()` and restore it, to keep estimates across runs."""
+    def __init__(self, runtimes: dict[str, float] = None, alpha: float = 0.2, default: float = 1.0):
+        if(not 0 < alpha <= 1):
+            raise ValueError("alpha should be in (0, 1]")
+
+        self.runtimes = dict(runtimes) if runtimes else {}
+        self.alpha = alpha
+        # Estimate of classes never recorded
+        self.default = default
+
+    def record(self, class_name: str, seconds: float):
+        if(class_name in self.runtimes):
+            self.runtimes[class_name] += self.alpha * (seconds - self.runtimes[class_name])
+        else:
+            self.runtimes[class_name] = seconds
+
+    def estimate(self, class_name: str):
+        return self.runtimes.get(class_name, self.default)
+
+    def to_dict(self):
+        return dict(self.runtimes)
+
+
+def critical_path(weights: Sequence[float], successors: Sequence[Sequence[int]]):
+    # Longest weighted path from each node to the sinks, including the node itself.
+    # Node ids must be in topological order.
+    lengths = list(weights)
+    for i in range(len(lengths) - 1, -1, -1):
+        if(successors[i]):
+            lengths[i] += max(lengths[s] for s in successors[i])
+
+    return lengths
@@ -1,16 +1,278 @@
+import array
+import struct
+import zlib
+from abc import ABC, abstractmethod
+
 import msgpack
 import lz4.frame
 
 
-def serialize(data):
-    serialized = msgpack.packb(data)
-    compressed = lz4.frame.compress(serialized)
+# Layout of a frame:
+# MAGIC | meta length (uint32) | meta | body | buffers
+# meta is msgpack of [body codec id, body offset, body length, [[codec id, offset, length], ...]].
+# body is msgpack of the object, in which large bytes and buffer-protocol objects are ext references to buffers.
+# Buffers are stored out-of-band, aligned, so raw ones can be viewed in place (e.g. from an mmap).
+MAGIC = b'MOI\x01'
+# Frames written before the codec layer are plain lz4 frames of msgpack.
+_LZ4_MAGIC = b'\x04\x22\x4d\x18'
+_BUFFER_EXT = 0x01
+_ALIGNMENT = 64
+# bytes shorter than this are kept inline in the body.
+_INLINE_BYTES = 2 ** 12
+# Containers longer than this are packed at once by msgpack instead of walked.
+_WALK_LENGTH = 32
+_SCALARS = (type(None), bool, int, float, str)
+
+# Kinds of out-of-band buffers
+_BYTES, _BYTEARRAY, _MEMORYVIEW, _NDARRAY = 0, 1, 2, 3
+
+
+class Codec(ABC):
+    """Compression codec of serialized payloads.
+    The `id` is written into frames, so it must be unique and stable, 0 is reserved for raw payloads."""
+    id: int
+    name: str
+
+    @abstractmethod
+    def compress(self, data) -> bytes:
+        pass
+
+    @abstractmethod
+    def decompress(self, data) -> bytes:
+        pass
+
+
+class LZ4Codec(Codec):
+    id = 1
+    name = 'lz4'
+
+    def compress(self, data):
+        return lz4.frame.compress(data)
+
+    def decompress(self, data):
+        return lz4.frame.decompress(data)
+
+
+class ZlibCodec(Codec):
+    id = 2
+    name = 'zlib'
+
+    def __init__(self, level: int = 6):
+        self.level = level
+
+    def compress(self, data):
+        return zlib.compress(data, self.level)
+
+    def decompress(self, data):
+        return zlib.decompress(data)
+
+
+CODECS = {}
+_CODEC_IDS = {}
+
+
+def register_codec(codec: Codec):
+    if(not 0 < codec.id < 256):
+        raise ValueError(f"Codec id should be in [1, 255], got {codec.id}.")
+    if(codec.id in _CODEC_IDS and _CODEC_IDS[codec.id].name != codec.name):
+        raise ValueError(f"Codec id {codec.id} is already registered by {_CODEC_IDS[codec.id].name}.")
+
+    CODECS[codec.name] = codec
+    _CODEC_IDS[codec.id] = codec
+
+
+register_codec(LZ4Codec())
+register_codec(ZlibCodec())
+
+
+def _compress(data, codec: Codec, min_size: int):
+    # Returns (codec id, payload), keeps small or incompressible payloads raw.
+    size = len(data)
+    if(codec is None or size < min_size):
+        return 0, data
+
+    if(size > 2 ** 18):
+        # Estimate compressibility on a sample from the middle before compressing everything
+        start = size // 2 - 2 ** 15
+        sample = data[start: start + 2 ** 16]
+        if(len(codec.compress(sample)) > len(sample) * 0.9):
+            return 0, data
+
+    compressed = codec.compress(data)
+    if(len(compressed) > size * 0.9):
+        return 0, data
+
+    return codec.id, compressed
+
+
+def _is_ndarray(obj):
+    return type(obj).__module__ == 'numpy' and hasattr(obj, 'dtype') and hasattr(obj, 'shape')
+
+
+class _Encoder:
+    def __init__(self):
+        self.packer = msgpack.Packer(default=self._default)
+        self.chunks = []
+        self.buffers = []
+
+    def _reference(self, obj):
+        # Returns an ext type referring to an out-of-band buffer
+        if(isinstance(obj, bytes)):
+            kind, buffer, meta = _BYTES, memoryview(obj), None
+        elif(isinstance(obj, bytearray)):
+            kind, buffer, meta = _BYTEARRAY, memoryview(obj), None
+        elif(_is_ndarray(obj)):
+            if(obj.dtype.hasobject):
+                raise TypeError(f"Cannot serialize array of dtype {obj.dtype}.")
+            if(not obj.flags.c_contiguous):
+                obj = obj.copy()
+            kind, buffer, meta = _NDARRAY, memoryview(obj.reshape(-1)), [obj.dtype.str, list(obj.shape)]
+        else:
+            try:
+                buffer = memoryview(obj)
+            except TypeError:
+                raise TypeError(f"Cannot serialize object of type {type(obj)}.") from None
+            kind, meta = _MEMORYVIEW, [buffer.format, list(buffer.shape)]
+            if(not buffer.c_contiguous):
+                buffer = memoryview(buffer.tobytes())
+
+        if(not buffer.nbytes):
+            # Views with zeros in the shape cannot be cast
+            buffer = memoryview(b'')
+        elif(buffer.ndim != 1 or buffer.format != 'B'):
+            buffer = buffer.cast('B')
+        self.buffers.append(buffer)
+
+        return msgpack.ExtType(_BUFFER_EXT, msgpack.packb([len(self.buffers) - 1, kind, meta]))
+
+    def _default(self, obj):
+        # Fallback of msgpack inside containers packed at once, and for integers out of its range
+        if(isinstance(obj, int)):
+            raise OverflowError(f"Cannot serialize integer of {obj.bit_length()} bits, msgpack supports up to 64 bits.")
+        return self._reference(obj)
+
+    def encode(self, obj):
+        if(type(obj) in _SCALARS):
+            self.chunks.append(self.packer.pack(obj))
+        elif(isinstance(obj, (list, tuple))):
+            if(len(obj) > _WALK_LENGTH):
+                self.chunks.append(self.packer.pack(obj))
+            else:
+                self.chunks.append(self.packer.pack_array_header(len(obj)))
+                for v in obj:
+                    self.encode(v)
+        elif(isinstance(obj, dict)):
+            if(len(obj) > _WALK_LENGTH):
+                self.chunks.append(self.packer.pack(obj))
+            else:
+                self.chunks.append(self.packer.pack_map_header(len(obj)))
+                for k, v in obj.items():
+                    self.encode(k)
+                    self.encode(v)
+        elif(isinstance(obj, (bytes, bytearray)) and len(obj) < _INLINE_BYTES):
+            self.chunks.append(self.packer.pack(obj))
+        elif(isinstance(obj, _SCALARS)):
+            self.chunks.append(self.packer.pack(obj))
+        else:
+            self.chunks.append(self.packer.pack(self._reference(obj)))
+
+
+def serialize_chunks(data, codec: str = 'lz4', min_size: int = 2 ** 10):
+    """Serialize into a list of buffers, which can be written out without joining them.
+    Large bytes and buffer-protocol objects are not copied when they are stored raw."""
+    codec = None if codec is None else CODECS[codec]
+    encoder = _Encoder()
+    encoder.encode(data)
+
+    body_codec, body = _compress(b''.join(encoder.chunks), codec, min_size)
+    buffers = [_compress(b, codec, min_size) for b in encoder.buffers]
+
+    # The meta length depends on offsets, so leave room for the largest offsets first
+    meta_size = len(msgpack.packb([255, 2 ** 63, 2 ** 63, [[255, 2 ** 63, 2 ** 63]] * len(buffers)]))
+    offset = len(MAGIC) + 4 + meta_size
+    offset += -offset % _ALIGNMENT
+    body_offset = offset
+    offset += len(body)
+    table = []
+    for buffer_codec, buffer in buffers:
+        offset += -offset % _ALIGNMENT
+        table.append([buffer_codec, offset, len(buffer)])
+        offset += len(buffer)
+
+    meta = msgpack.packb([body_codec, body_offset, len(body), table])
+    chunks = [MAGIC, struct.pack('<I', len(meta)), meta]
+    chunks.append(b'\x00' * (body_offset - len(MAGIC) - 4 - len(meta)))
+    chunks.append(body)
+    position = body_offset + len(body)
+    for (_, buffer), (_, buffer_offset, _) in zip(buffers, table):
+        chunks.append(b'\x00' * (buffer_offset - position))
+        chunks.append(buffer)
+        position = buffer_offset + len(buffer)
+
+    return chunks
+
+
+def serialize(data, codec: str = 'lz4', min_size: int = 2 ** 10):
+    return b''.join(serialize_chunks(data, codec, min_size))
+
+
+def _decompress(codec_id: int, data: memoryview):
+    if(codec_id == 0):
+        return data
+    if(codec_id not in _CODEC_IDS):
+        raise ValueError(f"Unknown codec id {codec_id}.")
+
+    return memoryview(_CODEC_IDS[codec_id].decompress(data))
+
+
+def _to_ndarray(buffer: memoryview, dtype: str, shape: list):
+    try:
+        import numpy as np
+    except ImportError:
+        return buffer
+
+    return np.frombuffer(buffer, dtype=dtype).reshape(shape)
+
+
+def _empty_view(buffer_format: str):
+    # Empty views cannot be cast to other formats, keep the format if it is a typecode of `array`
+    try:
+        return memoryview(array.array(buffer_format))
+    except (TypeError, ValueError):
+        return memoryview(b'')
+
+
+def deserialize(data):
+    """Deserialize from bytes or any buffer, e.g. an mmap.
+    Raw buffers are viewed in place: memoryviews and NumPy arrays share memory with `data` and are read-only."""
+    view = memoryview(data)
+    if(view[:len(_LZ4_MAGIC)] == _LZ4_MAGIC):
+        return msgpack.unpackb(lz4.frame.decompress(view))
+    if(view[:len(MAGIC)] != MAGIC):
+        raise ValueError("Not a moirae serialized frame.")
+
+    meta_size, = struct.unpack_from('<I', view, len(MAGIC))
+    body_codec, body_offset, body_size, table = msgpack.unpackb(view[len(MAGIC) + 4: len(MAGIC) + 4 + meta_size])
+
+    def ext_hook(code, ext_data):
+        if(code != _BUFFER_EXT):
+            return msgpack.ExtType(code, ext_data)
 
-    return compressed
+        index, kind, meta = msgpack.unpackb(ext_data)
+        buffer_codec, offset, size = table[index]
+        buffer = _decompress(buffer_codec, view[offset: offset + size])
+        if(kind == _BYTES):
+            return bytes(buffer)
+        elif(kind == _BYTEARRAY):
+            return bytearray(buffer)
+        elif(kind == _NDARRAY):
+            return _to_ndarray(buffer, *meta)
 
+        buffer_format, shape = meta
+        if(not len(buffer)):
+            return _empty_view(buffer_format)
+        return buffer.cast(buffer_format, shape) if shape else buffer.cast(buffer_format)
 
-def deserialize(data: bytes):
-    decompressed = lz4.frame.decompress(data)
-    obj = msgpack.unpackb(decompressed)
+    body = _decompress(body_codec, view[body_offset: body_offset + body_size])
 
-    return obj
+    return msgpack.unpackb(body, ext_hook=ext_hook)
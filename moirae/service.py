@@ -0,0 +1,163 @@
+import asyncio
+from collections import deque
+from contextlib import asynccontextmanager
+from time import perf_counter
+from typing import Union
+
+from moirae.backend import Backend, BACKENDS
+from moirae.batching import Batcher
+from moirae.singleflight import SingleFlight
+from moirae.executor import Executor
+from moirae import Graph, Plan, Cache
+
+
+class PoolSaturated(RuntimeError):
+    # The pool rejected a submission, too many graphs are waiting to run.
+    pass
+
+
+class ExecutorPool:
+    """Long-lived pool running graph submissions on one event loop, for services.
+    Cache, backends, deduplication and batching are shared by all runs. At most `max_running` graphs run at once
+    and at most `max_nodes` nodes execute at once across them. Up to `max_queued` submissions wait for a slot,
+    further ones (or ones waiting longer than `queue_timeout` seconds) are rejected with `PoolSaturated`.
+    Other keyword arguments are defaults of the executors."""
+    def __init__(self, cache: Cache = None,
+        max_running: int = 64, max_queued: int = 1024, queue_timeout: float = None, max_nodes: int = None,
+        backends: dict[str, Backend] = None, max_workers: int = None, batcher: Union[bool, Batcher] = False,
+        window: float = 60.0, **executor_kwargs):
+        if(max_running < 1):
+            raise ValueError("max_running should be >= 1")
+        if(max_queued < 0):
+            raise ValueError("max_queued should be >= 0")
+        if(max_nodes is not None and max_nodes < 1):
+            raise ValueError("max_nodes should be >= 1")
+
+        self.cache = cache
+        self.max_running = max_running
+        self.max_queued = max_queued
+        self.queue_timeout = queue_timeout
+        self.max_nodes = max_nodes
+
+        # Backends passed in are shared, backends created by the pool are shut down on close.
+        self.backends = dict(backends) if backends else {}
+        self.max_workers = max_workers
+        self._owned_backends = []
+        for name in BACKENDS:
+            if(name not in self.backends):
+                self.backends[name] = BACKENDS[name](max_workers)
+                self._owned_backends.append(self.backends[name])
+
+        self.executor_kwargs = executor_kwargs
+        self.executor_kwargs.setdefault('cache', cache)
+        self.executor_kwargs['backends'] = self.backends
+        self.executor_kwargs['batcher'] = Batcher() if batcher is True else (batcher or None)
+        # Runs without cache deduplicate nodes in flight among themselves
+        if(cache is None and self.executor_kwargs.get('single_flight', True) is True):
+            self.executor_kwargs['single_flight'] = SingleFlight()
+
+        self._slots = asyncio.Semaphore(max_running)
+        self._node_limiter = asyncio.Semaphore(max_nodes) if max_nodes is not None else None
+        self._running = 0
+        self._queued = 0
+        self._idle = asyncio.Event()
+        self._idle.set()
+        self._closed = False
+
+        # Seconds of the sliding window of throughput and latency
+        self.window = window
+        # (finish time, latency) of runs finished in the window
+        self._finished = deque()
+        self._started = perf_counter()
+        self.stats = {'submitted': 0, 'completed': 0, 'failed': 0, 'cancelled': 0, 'rejected': 0}
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.close()
+
+    @asynccontextmanager
+    async def _admit(self):
+        if(self._closed):
+            raise RuntimeError("The executor pool is closed.")
+
+        # Reserve a place before waiting for a slot, or reject when the queue is full. Counted in the same step,
+        # as waiting for the slot may yield before acquiring it.
+        if(self._running + self._queued >= self.max_running + self.max_queued):
+            self.stats['rejected'] += 1
+            raise PoolSaturated(f"{self._running} graphs running and {self._queued} waiting, the pool is saturated.")
+
+        self._idle.clear()
+        self._queued += 1
+        start = perf_counter()
+        try:
+            await asyncio.wait_for(self._slots.acquire(), self.queue_timeout)
+        except asyncio.TimeoutError as e:
+            self.stats['rejected'] += 1
+            raise PoolSaturated(f"Waited over {self.queue_timeout}s for a slot, the pool is saturated.") from e
+        finally:
+            self._queued -= 1
+            self._check_idle()
+
+        self._running += 1
+        self.stats['submitted'] += 1
+        try:
+            yield
+        except (asyncio.CancelledError, GeneratorExit):
+            # Cancelled or stream closed early
+            self.stats['cancelled'] += 1
+            raise
+        except BaseException:
+            self.stats['failed'] += 1
+            raise
+        else:
+            self.stats['completed'] += 1
+            self._finished.append((perf_counter(), perf_counter() - start))
+        finally:
+            self._running -= 1
+            self._slots.release()
+            self._check_idle()
+
+    def _check_idle(self):
+        if(not self._running and not self._queued):
+            self._idle.set()
+
+    async def stream(self, graph: Union[Graph, Plan], **kwargs):
+        """Run the graph in the pool, yield (node_name, outputs) as `moirae.Executor`.
+        Keyword arguments override the executor defaults of the pool."""
+        async with self._admit():
+            async with Executor(graph, **{**self.executor_kwargs, 'node_limiter': self._node_limiter, **kwargs}) as exe:
+                async for item in exe:
+                    yield item
+                await exe.execution
+
+    async def run(self, graph: Union[Graph, Plan], **kwargs):
+        """Run the graph in the pool, return {node_name: outputs}."""
+        return {node_name: node_output async for (node_name, node_output) in self.stream(graph, **kwargs)}
+
+    def metrics(self):
+        """Queue depth, load and throughput (runs per second) and mean latency (seconds from submission)
+        of runs finished in the last `window` seconds."""
+        now = perf_counter()
+        while(self._finished and self._finished[0][0] < now - self.window):
+            self._finished.popleft()
+        elapsed = min(self.window, now - self._started)
+
+        return {
+            'running': self._running,
+            'queued': self._queued,
+            'throughput': len(self._finished) / elapsed if elapsed > 0 else 0.0,
+            'latency': sum(l for _, l in self._finished) / len(self._finished) if self._finished else 0.0,
+            **self.stats,
+        }
+
+    async def close(self, wait: bool = True):
+        """Reject new submissions, wait for submitted runs to finish and shut down backends created by the pool."""
+        self._closed = True
+        if(wait):
+            await self._idle.wait()
+
+        for b in self._owned_backends:
+            b.shutdown()
+        self._owned_backends = []
@@ -0,0 +1,64 @@
+import asyncio
+import weakref
+
+
+class FlightAbandoned(Exception):
+    # The executor computing a hash was cancelled, waiters should compute it themselves.
+    pass
+
+
+class SingleFlight:
+    """Futures of node hashes being computed, so nodes with the same hash wait for the first computation
+    instead of executing again. Shared by executors running on the same event loop."""
+    def __init__(self):
+        self._flights = {}
+
+    def __len__(self):
+        return len(self._flights)
+
+    def join(self, hash_key: str):
+        # Returns the future of the computation in flight, or None.
+        future = self._flights.get(hash_key)
+        if(future is None or future.done() or future.get_loop() is not asyncio.get_running_loop()):
+            return None
+
+        return future
+
+    def begin(self, hash_key: str):
+        future = asyncio.get_running_loop().create_future()
+        # Failures without waiters are not errors of the future
+        future.add_done_callback(lambda f: f.cancelled() or f.exception())
+        self._flights[hash_key] = future
+
+        return future
+
+    def end(self, hash_key: str, future: asyncio.Future, outputs=None, exception: BaseException = None):
+        if(self._flights.get(hash_key) is future):
+            del self._flights[hash_key]
+
+        if(future.done()):
+            return
+        if(exception is None):
+            future.set_result(outputs)
+        elif(isinstance(exception, asyncio.CancelledError)):
+            future.set_exception(FlightAbandoned())
+        else:
+            future.set_exception(exception)
+
+
+# Cache -> SingleFlight shared by executors of the cache
+_GROUPS = weakref.WeakKeyDictionary()
+
+
+def flight_group(cache):
+    if(cache is None):
+        return SingleFlight()
+
+    try:
+        if(cache not in _GROUPS):
+            _GROUPS[cache] = SingleFlight()
+
+        return _GROUPS[cache]
+    except TypeError:
+        # Not hashable or weakly referable, only deduplicate in the executor
+        return SingleFlight()
@@ -0,0 +1,54 @@
+import os
+import pickle
+import shutil
+import sys
+import tempfile
+
+
+def sizeof(obj):
+    # Approximate memory footprint of plain data values, used for the memory budget of executors.
+    size = sys.getsizeof(obj)
+    if(isinstance(obj, dict)):
+        size += sum(sizeof(k) + sizeof(v) for k, v in obj.items())
+    elif(isinstance(obj, (list, tuple, set, frozenset))):
+        size += sum(sizeof(v) for v in obj)
+    elif(hasattr(obj, '__pydantic_fields__')):
+        size += sum(sizeof(v) for v in obj.__dict__.values())
+
+    return size
+
+
+class SpillStore:
+    """Temporary local store of values spilled out of memory. Values are pickled, so consumers load them back
+    exactly as they were (tuples, sets and dicts with any keys), unlike the msgpack encoding of `moirae.serialize`.
+    The directory is created on first spill and removed on `close`."""
+    def __init__(self, root_dir: str = None):
+        self.root_dir = root_dir
+        self._dir = None
+        self._count = 0
+
+    def put(self, value):
+        if(self._dir is None):
+            self._dir = tempfile.mkdtemp(prefix='moirae-spill-', dir=self.root_dir)
+
+        path = os.path.join(self._dir, str(self._count))
+        self._count += 1
+        with open(path, 'wb') as f:
+            pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+
+        return path
+
+    def get(self, path: str):
+        with open(path, 'rb') as f:
+            return pickle.load(f)
+
+    def remove(self, path: str):
+        try:
+            os.unlink(path)
+        except FileNotFoundError:
+            pass
+
+    def close(self):
+        if(self._dir is not None):
+            shutil.rmtree(self._dir, ignore_errors=True)
+            self._dir = None
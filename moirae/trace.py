@@ -0,0 +1,77 @@
+import json
+import os
+from time import perf_counter
+
+
+# Phases of a node recorded by the executor
+PHASES = ('wait', 'collect', 'validate', 'execute', 'shared', 'dispatch')
+
+
+class Tracer:
+    """Records spans of executor runs, summarized by `report` or exported by `chrome_trace`.
+    Spans are (name, category, node_name, start, end, args), times are `perf_counter` seconds.
+    A tracer can be shared by several runs, their spans are accumulated."""
+    def __init__(self):
+        self.origin = perf_counter()
+        self.spans = []
+        # node_name -> "hit" or "miss"
+        self.cache_status = {}
+
+    def record(self, name: str, category: str, node_name: str = None, start: float = None, end: float = None,
+        **args):
+        self.spans.append((name, category, node_name, start, perf_counter() if end is None else end, args))
+
+    def clear(self):
+        self.origin = perf_counter()
+        self.spans = []
+        self.cache_status = {}
+
+    def report(self):
+        """Structured summary of the recorded spans, durations are in seconds."""
+        nodes = {n: {'cache': s} for n, s in self.cache_status.items()}
+        cache = {'check': 0.0, 'get': 0.0, 'put': 0.0,
+            'hits': sum(s == 'hit' for s in self.cache_status.values()),
+            'misses': sum(s == 'miss' for s in self.cache_status.values())}
+        start, end = float('inf'), float('-inf')
+
+        for name, category, node_name, span_start, span_end, _ in self.spans:
+            start, end = min(start, span_start), max(end, span_end)
+            if(category == 'cache'):
+                cache[name] += span_end - span_start
+            if(node_name is not None):
+                phases = nodes.setdefault(node_name, {'cache': None})
+                phases[name] = phases.get(name, 0.0) + span_end - span_start
+
+        return {
+            'wall_time': end - start if self.spans else 0.0,
+            'nodes': nodes,
+            'cache': cache,
+        }
+
+    def chrome_trace(self):
+        """Trace events in the Chrome trace-event format, viewable in chrome://tracing or Perfetto.
+        Spans of each node are put in its own row."""
+        rows = {None: 0}
+        events = [{'ph': 'M', 'name': 'thread_name', 'pid': os.getpid(), 'tid': 0, 'args': {'name': 'executor'}}]
+        for name, category, node_name, start, end, args in self.spans:
+            if(node_name not in rows):
+                rows[node_name] = len(rows)
+                events.append({'ph': 'M', 'name': 'thread_name', 'pid': os.getpid(), 'tid': rows[node_name],
+                    'args': {'name': node_name}})
+
+            events.append({
+                'ph': 'X',
+                'name': name,
+                'cat': category,
+                'ts': (start - self.origin) * 1e6,
+                'dur': (end - start) * 1e6,
+                'pid': os.getpid(),
+                'tid': rows[node_name],
+                'args': args,
+            })
+
+        return {'traceEvents': events, 'displayTimeUnit': 'ms'}
+
+    def dump_chrome_trace(self, path: str):
+        with open(path, 'w') as f:
+            json.dump(self.chrome_trace(), f)
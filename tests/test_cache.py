@@ -0,0 +1,102 @@
+import asyncio
+
+import pytest
+
+import moirae
+
+
+# Number of executions of CacheIncrement
+executions = []
+
+
+class CacheIncrement(moirae.Node):
+    class Input(moirae.Data):
+        x: int
+
+    class Output(moirae.Data):
+        x: int
+
+    async def execute(self, inputs: Input):
+        executions.append(inputs.x)
+        return self.Output(x=inputs.x + 1)
+
+
+class CacheSleep(moirae.Node):
+    class Input(moirae.Data):
+        seconds: float
+
+    class Output(moirae.Data):
+        seconds: float
+
+    async def execute(self, inputs: Input):
+        await asyncio.sleep(inputs.seconds)
+        return self.Output(seconds=inputs.seconds)
+
+
+class FailingLoadCache(moirae.MemoryCache):
+    # Stores values, but fails to load them once `fail` is set
+    def __init__(self):
+        super().__init__()
+        self.fail = False
+        self.checked = 0
+
+    async def exists_many(self, keys):
+        self.checked += len(keys)
+        return await super().exists_many(keys)
+
+    async def load_many(self, keys):
+        if(self.fail):
+            return [IOError('lost')] * len(keys)
+        return await super().load_many(keys)
+
+
+def increment_chain(num_nodes: int):
+    graph = {'n0': {'node': 'CacheIncrement', 'arguments': {}, 'inputs': {'x': 0}}}
+    for i in range(1, num_nodes):
+        graph[f'n{i}'] = {'node': 'CacheIncrement', 'arguments': {}, 'inputs': {'x': f'${{n{i - 1}.x}}'}}
+
+    return moirae.Graph(graph)
+
+
+@pytest.mark.parametrize('kwargs', [{}, {'scheduler': 'queue'}, {'prune': True}, {'targets': ['n29']},
+    {'targets': ['n29'], 'scheduler': 'queue', 'max_concurrency': 1}])
+def test_failed_hits_run_once_in_the_same_run(kwargs):
+    graph = increment_chain(30)
+    cache = FailingLoadCache()
+    moirae.execute(graph, cache=cache)
+    cache.fail = True
+    cache.checked = 0
+    executions.clear()
+
+    with pytest.warns(UserWarning):
+        results = moirae.execute(graph, cache=cache, **kwargs)
+
+    assert cache.checked == 30
+    assert len(executions) == 30
+    assert results['n29'].x == 30
+    # Upstream scheduled only for the failed hits is not returned
+    if(kwargs.get('prune') or 'targets' in kwargs):
+        assert list(results) == ['n29']
+
+
+@pytest.mark.parametrize('interval', [0.01, None])
+def test_batched_puts_flushed_before_batch_fills(interval):
+    graph = moirae.Graph({
+        'fast': {'node': 'CacheIncrement', 'arguments': {}, 'inputs': {'x': 100}},
+        'slow': {'node': 'CacheSleep', 'arguments': {}, 'inputs': {'seconds': 0.3}},
+    })
+    plan = graph.compile()
+    fast_hash = plan.hashes[plan.names.index('fast')]
+    cache = moirae.MemoryCache()
+
+    async def run():
+        async with moirae.Executor(graph, cache=cache, cache_flush_interval=interval) as exe:
+            await asyncio.sleep(0.15)
+            during = await cache.exists_many([fast_hash])
+            results = {name: outputs async for name, outputs in exe}
+        return during[0], results, await cache.exists_many([fast_hash])
+
+    during, results, after = asyncio.run(run())
+    assert during == (interval is not None)
+    assert after == [True]
+    assert set(results) == {'fast', 'slow'}
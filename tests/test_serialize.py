@@ -0,0 +1,22 @@
+import array
+
+import pytest
+
+from moirae.serialize import serialize, deserialize
+
+
+@pytest.mark.parametrize('value', [array.array('i', []), array.array('d', []), memoryview(b''),
+    memoryview(array.array('i', [])), array.array('i', [1, 2, 3])])
+@pytest.mark.parametrize('codec', [None, 'lz4'])
+def test_buffer_round_trip(value, codec):
+    result = deserialize(serialize({'buffer': value}, codec=codec))['buffer']
+
+    view = memoryview(value)
+    assert result.format == view.format
+    assert result.tolist() == view.tolist()
+
+
+@pytest.mark.parametrize('value', [2 ** 64, -2 ** 63 - 1, [2 ** 70], {'a': 2 ** 70}, list(range(40)) + [2 ** 70]])
+def test_int_overflow(value):
+    with pytest.raises(OverflowError, match='64 bits'):
+        serialize(value)
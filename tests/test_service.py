@@ -0,0 +1,50 @@
+import asyncio
+
+import pytest
+
+import moirae
+
+
+class PoolSleep(moirae.Node):
+    class Input(moirae.Data):
+        seconds: float
+
+    class Output(moirae.Data):
+        seconds: float
+
+    async def execute(self, inputs: Input):
+        await asyncio.sleep(inputs.seconds)
+        return self.Output(seconds=inputs.seconds)
+
+
+def sleep_graph(seconds: float):
+    return moirae.Graph({'sleep': {'node': 'PoolSleep', 'arguments': {}, 'inputs': {'seconds': seconds}}})
+
+
+@pytest.mark.parametrize('queue_timeout', [None, 5.0])
+def test_burst_rejected_beyond_queue(queue_timeout):
+    async def burst():
+        async with moirae.ExecutorPool(max_running=2, max_queued=3, queue_timeout=queue_timeout) as pool:
+            results = await asyncio.gather(*(pool.run(sleep_graph(0.05)) for _ in range(8)),
+                return_exceptions=True)
+            return results, pool.metrics()
+
+    results, metrics = asyncio.run(burst())
+    assert sum(isinstance(r, dict) for r in results) == 5
+    assert sum(isinstance(r, moirae.PoolSaturated) for r in results) == 3
+    assert metrics['rejected'] == 3
+    assert metrics['queued'] == 0 and metrics['running'] == 0
+
+
+def test_queue_timeout_releases_reservation():
+    async def wait_out():
+        async with moirae.ExecutorPool(max_running=1, max_queued=1, queue_timeout=0.01) as pool:
+            first = asyncio.create_task(pool.run(sleep_graph(0.1)))
+            await asyncio.sleep(0)
+            with pytest.raises(moirae.PoolSaturated):
+                await pool.run(sleep_graph(0.0))
+            await first
+            # The timed out submission no longer holds its place in the queue
+            return await pool.run(sleep_graph(0.0))
+
+    assert asyncio.run(wait_out())['sleep'].seconds == 0.0
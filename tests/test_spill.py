@@ -0,0 +1,81 @@
+import asyncio
+import os
+from typing import Any
+
+import pytest
+
+import moirae
+
+
+class SpillProduce(moirae.Node):
+    class Input(moirae.Data):
+        pass
+
+    class Output(moirae.Data):
+        table: Any
+        pair: Any
+
+    async def execute(self, inputs: Input):
+        return self.Output(table={1: 'one', 2: 'two'}, pair=(1, 'one'))
+
+
+class SpillEcho(moirae.Node):
+    class Input(moirae.Data):
+        table: Any
+        pair: Any
+
+    class Output(moirae.Data):
+        table: Any
+        pair: Any
+
+    async def execute(self, inputs: Input):
+        return self.Output(table=inputs.table, pair=inputs.pair)
+
+
+class SpillSleep(moirae.Node):
+    class Input(moirae.Data):
+        table: Any
+
+    class Output(moirae.Data):
+        table: Any
+
+    async def execute(self, inputs: Input):
+        await asyncio.sleep(10)
+        return self.Output(table=inputs.table)
+
+
+def spill_graph():
+    return moirae.Graph({
+        'produce': {'node': 'SpillProduce', 'arguments': {}, 'inputs': {}},
+        'echo': {'node': 'SpillEcho', 'arguments': {},
+            'inputs': {'table': '${produce.table}', 'pair': '${produce.pair}'}},
+    })
+
+
+@pytest.mark.parametrize('kwargs', [{}, {'scheduler': 'queue'}, {'trusted': True}])
+def test_spilled_values_round_trip(tmp_path, kwargs):
+    results = moirae.execute(spill_graph(), memory_budget=0, spill_threshold=0, spill_dir=str(tmp_path), **kwargs)
+
+    assert results['echo'].table == {1: 'one', 2: 'two'}
+    assert results['echo'].pair == (1, 'one')
+    assert isinstance(results['echo'].pair, tuple)
+    # The spill directory is removed once the run ends
+    assert os.listdir(tmp_path) == []
+
+
+@pytest.mark.parametrize('scheduler', ['latch', 'queue'])
+def test_spill_removed_when_left_early(tmp_path, scheduler):
+    graph = moirae.Graph({
+        'produce': {'node': 'SpillProduce', 'arguments': {}, 'inputs': {}},
+        'sleep': {'node': 'SpillSleep', 'arguments': {}, 'inputs': {'table': '${produce.table}'}},
+    })
+
+    async def leave_early():
+        async with moirae.Executor(graph, memory_budget=0, spill_threshold=0, spill_dir=str(tmp_path),
+            scheduler=scheduler) as executor:
+            async for name, outputs in executor:
+                assert os.listdir(tmp_path)
+                break
+
+    asyncio.run(leave_early())
+    assert os.listdir(tmp_path) == []